@@ -1,38 +1,99 @@
 import random
 import sys
 
+from batch_moves import iter_best_moves
+from bitboard import BitBoard, list_is_winner, print_list_board
+from engines import MoveResult, engine_board
+from geometry import get_geometry
+from move_ordering import MoveOrderer
+from position_store import depth_kind, open_store
+from search_budget import SearchBudget, SearchTimeout
+from search_stats import SearchStats, instrumented
+from solved_table import SolvedTable
+from static_eval import EvalBitBoard, LineEvaluator
+from transposition import (EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable,
+                           from_node_score, to_node_score)
+
+# Half-width of the aspiration window around the score two plies shallower
+ASPIRATION_WINDOW = 1
+
 
 class AlphaBetaTicTacToe:
 
-    def __init__(self):
-        # A list of 9 items representing the 3x3 board
-        self.board = [" " for _ in range(9)]
+    def __init__(self, geometry=None, use_transposition=True, tt_max_size=65536,
+                 use_solved_table=True, solved_table_path=None, move_ordering=True, shuffle_root=True,
+                 negamax=False, size=None, depth_limit=None, static_eval=None, position_store=None):
+        # geometry: rows x cols board, k in a row wins (classic 3x3 by default);
+        # size is the shortcut for a size x size full-row board
+        if geometry is None:
+            geometry = 3 if size is None else size
+        self.geometry = get_geometry(geometry)
+        # A list of rows * cols items, " "/"X"/"O" (9 items for the 3x3 board)
+        self.board = [" " for _ in range(self.geometry.cells)]
         self.human = "O"
         self.ai = "X"
+        # Score of a win found right away; 10 on 3x3, and large enough that
+        # win_score - depth stays positive on bigger boards
+        self.win_score = self.geometry.cells + 1
+        # Horizon scores from open lines (static_eval.py); on by default except on 3x3,
+        # which is always searched to the end. Wins are moved above every static score
+        # so that win_score - depth always beats the evaluator.
+        if static_eval is None:
+            static_eval = self.geometry is not get_geometry(3)
+        self.static_eval = static_eval
+        if static_eval:
+            self.win_score += LineEvaluator(self.geometry).max_score
+        # Lowest score that still means a forced win (see transposition.to_node_score)
+        self.win_threshold = self.win_score - self.geometry.cells
+        # Plies to search without a budget (None: to the end of the game)
+        self.depth_limit = depth_limit
         self.states_evaluated = 0  # Counter to show efficiency
+        self.best_score = None  # Score of the last move chosen (AI's point of view)
+        # Transposition table survives between moves; counters are per move
+        self.tt = TranspositionTable(tt_max_size) if use_transposition else None
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.tt_stores = 0
+        # Budget bookkeeping: set for the duration of a budgeted search
+        self._budget = None
+        self._depth_limit = None
+        self._hit_horizon = False
+        self.budget_used = {}
+        # Move ordering (wins/blocks, killers, history, center > corner > edge);
+        # cutoff counters are per move
+        self.orderer = MoveOrderer(self.geometry) if move_ordering else None
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Shuffle the root moves first so equal moves are picked at random
+        self.shuffle_root = shuffle_root
+        # Negamax mode: principal-variation search with aspiration windows (see negamax())
+        self.negamax_mode = negamax
+        self.principal_variation = []
+        self.aspiration_researches = 0
+        self.pvs_researches = 0
+        self._pv = [[] for _ in range(self.geometry.cells + 2)]
+        self._last_pv = []  # Principal variation of the last completed depth, searched first
+        self._follow_pv = False
+        # Statistics of the last get_best_move call, and an optional profiler (search_stats.py)
+        self.stats = SearchStats()
+        self.profile_hook = None
+        self._deepest = 0
+        # Solved 3x3 table (see solved_table.py); None if it hasn't been built or the board isn't 3x3
+        self.solved_table = None
+        if use_solved_table and self.geometry is get_geometry(3):
+            self.solved_table = SolvedTable.load(solved_table_path)
+        # Persistent position cache shared across runs (position_store.py), or None
+        self.position_store = open_store(position_store)
 
     def reset_board(self):
-        self.board = [" " for _ in range(9)]
+        self.board = [" " for _ in range(self.geometry.cells)]
 
     def print_board(self):
-        print("\n")
-        print(f" {self.board[0]} | {self.board[1]} | {self.board[2]} ")
-        print("---+---+---")
-        print(f" {self.board[3]} | {self.board[4]} | {self.board[5]} ")
-        print("---+---+---")
-        print(f" {self.board[6]} | {self.board[7]} | {self.board[8]} ")
-        print("\n")
+        print_list_board(self.board, self.geometry)
 
     def is_winner(self, player, board_state):
-        win_conditions = [
-            (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Rows
-            (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Cols
-            (0, 4, 8), (2, 4, 6)              # Diagonals
-        ]
-        for a, b, c in win_conditions:
-            if board_state[a] == board_state[b] == board_state[c] == player:
-                return True
-        return False
+        # Winning segments are precomputed once per geometry (geometry.py)
+        return list_is_winner(player, board_state, self.geometry)
 
     def is_full(self, board_state):
         return " " not in board_state
@@ -44,29 +105,76 @@ class AlphaBetaTicTacToe:
     # PHASE 3 LOGIC: ALPHA-BETA PRUNING (The Optimization)
     # ---------------------------------------------------------
     
-    def minimax_alphabeta(self, board, depth, is_maximizing, alpha, beta):
+    def minimax_alphabeta(self, board, depth, is_maximizing, alpha, beta, last_move=None):
         """
-        Optimized Minimax.
+        Optimized Minimax on a BitBoard.
         alpha: Best value that the maximizer (AI) can guarantee at that level or above.
         beta: Best value that the minimizer (Human) can guarantee at that level or above.
+        last_move: if given, the win check only looks at the segments through that cell.
         """
         self.states_evaluated += 1
+        if depth > self._deepest:
+            self._deepest = depth
+        if self._budget is not None:
+            self._budget.check(self.states_evaluated)
         
-        # 1. Base Cases
-        if self.is_winner(self.ai, board):
-            return 10 - depth
-        if self.is_winner(self.human, board):
-            return -10 + depth
-        if self.is_full(board):
+        # 1. Base Cases (Terminal States)
+        # Only the player who just moved can have won, through last_move
+        if last_move is None:
+            ai_won = board.is_winner(self.ai)
+            human_won = not ai_won and board.is_winner(self.human)
+        else:
+            ai_won = not is_maximizing and board.is_winner_at(self.ai, last_move)
+            human_won = is_maximizing and board.is_winner_at(self.human, last_move)
+        if ai_won:
+            return self.win_score - depth
+        if human_won:
+            return -self.win_score + depth
+        if board.is_full():
             return 0
 
-        # 2. Recursive Step with Pruning
+        # 2. Horizon (only when iterative deepening sets a depth limit)
+        # draft = plies still to search below this position
+        empties = board.move_count()
+        draft = empties
+        if self._depth_limit is not None:
+            draft = min(empties, self._depth_limit - depth)
+            if draft <= 0:
+                self._hit_horizon = True
+                return self.evaluate(board)
+
+        # 3. Transposition Lookup
+        # Bounds narrow the window; an exact score (or a crossed window) ends the search here
+        tt = self.tt
+        if tt is not None:
+            key = (board.canonical_key() << 1) | is_maximizing
+            entry = tt.lookup(key)
+            if entry is not None and entry[2] >= draft:
+                if entry[2] < empties:
+                    self._hit_horizon = True  # Entry came from a depth-limited search
+                score = from_node_score(entry[0], depth, self.win_threshold)
+                flag = entry[1]
+                if flag == EXACT:
+                    return score
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
+        alpha_orig = alpha
+        beta_orig = beta
+
+        # 4. Recursive Step with Pruning
+        moves = board.get_available_moves()
+        if self.orderer is not None:
+            moves = self.orderer.order(board, moves, self.ai if is_maximizing else self.human, depth)
         if is_maximizing:
             best_score = -float('inf')
-            for move in self.get_available_moves(board):
-                board[move] = self.ai
-                score = self.minimax_alphabeta(board, depth + 1, False, alpha, beta)
-                board[move] = " " # Undo
+            for index, move in enumerate(moves):
+                board.make_move(move, self.ai)
+                score = self.minimax_alphabeta(board, depth + 1, False, alpha, beta, move)
+                board.unmake_move(move, self.ai) # Undo
                 best_score = max(score, best_score)
                 
                 # Update Alpha
@@ -74,14 +182,14 @@ class AlphaBetaTicTacToe:
                 
                 # Pruning: If alpha >= beta, the minimizer will never allow this branch
                 if beta <= alpha:
-                    break 
-            return best_score
+                    self._record_cutoff(move, self.ai, depth, draft, index)
+                    break
         else:
             best_score = float('inf')
-            for move in self.get_available_moves(board):
-                board[move] = self.human
-                score = self.minimax_alphabeta(board, depth + 1, True, alpha, beta)
-                board[move] = " " # Undo
+            for index, move in enumerate(moves):
+                board.make_move(move, self.human)
+                score = self.minimax_alphabeta(board, depth + 1, True, alpha, beta, move)
+                board.unmake_move(move, self.human) # Undo
                 best_score = min(score, best_score)
                 
                 # Update Beta
@@ -89,35 +197,211 @@ class AlphaBetaTicTacToe:
                 
                 # Pruning
                 if beta <= alpha:
+                    self._record_cutoff(move, self.human, depth, draft, index)
                     break
-            return best_score
 
-    def get_best_move(self, verbose=True):
+        if tt is not None:
+            if best_score <= alpha_orig:
+                flag = UPPER_BOUND
+            elif best_score >= beta_orig:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            tt.store(key, to_node_score(best_score, depth, self.win_threshold), flag, draft)
+        return best_score
+
+    def _record_cutoff(self, move, player, depth, draft, index):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if self.orderer is not None:
+            self.orderer.record_cutoff(move, player, depth, draft)
+
+    def cutoff_stats(self):
+        """Beta cutoffs in the last search and how many came from the first move tried."""
+        return {
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+        }
+
+    def evaluate(self, board):
+        """
+        Score of a non-terminal position at the depth limit, for the AI.
+        With static_eval it is the open-line score kept by the EvalBitBoard
+        (always below win_score - depth); without it an unfinished game
+        counts as a draw.
+        """
+        if not self.static_eval:
+            return 0
+        score = board.evaluator.score
+        return score if self.ai == "X" else -score
+
+    def choose_move(self, board, player=None, time_limit_ms=None, node_limit=None):
+        """Engine protocol (engines.py): the move for `player` on `board` and the stats of its search."""
+        self.board = engine_board(board, player, self.geometry, self.ai)
+        move = self.get_best_move(verbose=False, time_limit_ms=time_limit_ms, node_limit=node_limit)
+        return MoveResult(move, self.stats, self.best_score)
+
+    def best_moves(self, positions, player=None, time_limit_ms=None, node_limit=None):
+        """
+        Batch API (batch_moves.py): a generator of BatchResult(index, move,
+        score, cached) for each position, symmetric duplicates searched once.
+        """
+        return iter_best_moves(self, positions, player, time_limit_ms, node_limit)
+
+    @instrumented
+    def get_best_move(self, verbose=True, time_limit_ms=None, node_limit=None, return_pv=False):
         """
         Entry point for Alpha-Beta Search.
+        With time_limit_ms and/or node_limit it runs iterative deepening and
+        returns the best move of the last fully completed depth. With
+        self.depth_limit it deepens no further than that many plies.
+        self.budget_used reports the time and nodes actually spent.
+
+        With return_pv it returns (move, principal variation), the expected
+        line of play starting with the move (also kept in
+        self.principal_variation). Only negamax mode and the solved table
+        track the full line; plain alpha-beta gives just [move].
         """
+        budget = SearchBudget(time_limit_ms, node_limit)
         self.states_evaluated = 0 # Reset counter
-        best_score = -float('inf')
-        best_move = None
-        
-        available_moves = self.get_available_moves(self.board)
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.aspiration_researches = 0
+        self.pvs_researches = 0
+        self._deepest = 0
+        if self.tt is not None:
+            self.tt.reset_stats()
+        if self.orderer is not None:
+            self.orderer.reset()
+
+        board_class = EvalBitBoard if self.static_eval else BitBoard
+        board = board_class.from_list(self.board, self.geometry)
+
+        # Solved Table: constant-time answer, search only runs without it
+        if self.solved_table is not None:
+            entry = self.solved_table.lookup(board, self.ai, self.win_score)
+            if entry is not None and entry[1] is not None:
+                self.budget_used = budget.report(0, completed_depth=None, source="solved_table")
+                self.best_score = entry[0]
+                self.principal_variation = self._solved_table_pv(board)
+                if verbose:
+                    print(f"AI chooses spot {entry[1]} from the solved table (score {entry[0]})")
+                return (entry[1], self.principal_variation) if return_pv else entry[1]
+
+        # Persistent cache: earlier searches of this position (or a symmetric copy)
+        entry = self._stored_move(board, budget)
+        if entry is not None:
+            self.budget_used = budget.report(0, completed_depth=None, source="position_store")
+            self.best_score = entry[0]
+            self.principal_variation = [entry[1]]
+            if verbose:
+                print(f"AI chooses spot {entry[1]} from the position cache (score {entry[0]})")
+            return (entry[1], self.principal_variation) if return_pv else entry[1]
+
+        available_moves = board.get_available_moves()
         
         # Optional: Shuffle moves to add randomness if scores are equal (makes AI less predictable)
-        random.shuffle(available_moves)
+        if self.shuffle_root:
+            random.shuffle(available_moves)
+        # Stable sort, so the shuffle still decides between equally ordered moves
+        if self.orderer is not None:
+            available_moves = self.orderer.order(board, available_moves, self.ai)
         
         if verbose:
             print("AI Thinking (Alpha-Beta Search)...")
 
+        pv = None
+        exact = False  # Every line searched to the end of the game
+        if self.negamax_mode:
+            best_move, best_score, pv, completed_depth = self._negamax_search(board, available_moves, budget, verbose)
+            exact = not budget.limited and self.depth_limit is None
+        elif not budget.limited and self.depth_limit is None:
+            best_move, best_score = self._search_root(board, available_moves, verbose)
+            completed_depth = len(available_moves)
+            exact = True
+        else:
+            # Iterative deepening: every completed depth gives a usable answer
+            best_move, best_score = available_moves[0], None
+            completed_depth = 0
+            self._budget = budget if budget.limited else None
+            try:
+                for depth_limit in range(1, self._max_depth(available_moves) + 1):
+                    # Root moves are ply 1, so children see depth_limit - 1 plies below them
+                    self._depth_limit = depth_limit - 1
+                    self._hit_horizon = False
+                    best_move, best_score = self._search_root(board, available_moves, False)
+                    completed_depth = depth_limit
+                    if verbose:
+                        print(f"  Depth {depth_limit}: spot {best_move} (score {best_score})")
+                    if not self._hit_horizon:
+                        exact = True
+                        break  # Nothing was cut off: the result is exact
+                    # Search the best move so far first next time (tighter alpha sooner)
+                    available_moves.remove(best_move)
+                    available_moves.insert(0, best_move)
+            except SearchTimeout:
+                pass
+            finally:
+                self._budget = None
+                self._depth_limit = None
+
+        self.budget_used = budget.report(self.states_evaluated, completed_depth=completed_depth, source="search",
+                                         aspiration_researches=self.aspiration_researches,
+                                         pvs_researches=self.pvs_researches, **self.cutoff_stats())
+        self.principal_variation = pv if pv else [best_move]
+        self.best_score = best_score
+        if self.position_store is not None and not budget.limited:
+            if exact:
+                self.position_store.put_move(board, best_score, best_move, win_score=self.win_score)
+            elif self.depth_limit is not None:
+                self.position_store.put_move(board, best_score, best_move,
+                                             kind=depth_kind(self.depth_limit, self.static_eval))
+        if self.tt is not None:
+            self.tt_hits = self.tt.hits
+            self.tt_misses = self.tt.misses
+            self.tt_stores = self.tt.stores
+            self.stats.cache_hits = self.tt.hits
+            self.stats.cache_misses = self.tt.misses
+        self.stats.nodes = self.states_evaluated
+        self.stats.cutoffs = self.cutoffs
+        # Root moves are ply 1 (depth 0)
+        self.stats.max_depth = self._deepest + 1 if self.states_evaluated else 0
+
+        if verbose:
+            print(f"AI chooses spot {best_move} (States evaluated: {self.states_evaluated}, "
+                  f"cutoffs: {self.cutoffs}, {self.first_move_cutoffs} on the first move)")
+
+        return (best_move, self.principal_variation) if return_pv else best_move
+
+    def _stored_move(self, board, budget):
+        """
+        (score, move) from the position store: an exact result, or, for an
+        unbudgeted depth-limited search, one searched as deep with the same
+        evaluation. None if there is neither.
+        """
+        if self.position_store is None:
+            return None
+        entry = self.position_store.get_move(board, win_score=self.win_score)
+        if entry is None and self.depth_limit is not None and not budget.limited:
+            entry = self.position_store.get_move(board, kind=depth_kind(self.depth_limit, self.static_eval))
+        return entry
+
+    def _search_root(self, board, available_moves, verbose):
+        """Alpha-beta over the root moves; returns (best_move, best_score)."""
+        best_score = -float('inf')
+        best_move = None
         alpha = -float('inf')
         beta = float('inf')
 
         for move in available_moves:
-            self.board[move] = self.ai
+            board.make_move(move, self.ai)
             
             # Call optimized minimax
-            score = self.minimax_alphabeta(self.board, 0, False, alpha, beta)
+            score = self.minimax_alphabeta(board, 0, False, alpha, beta, move)
             
-            self.board[move] = " "
+            board.unmake_move(move, self.ai)
             
             if verbose:
                 print(f"  Spot {move}: Score {score}")
@@ -128,11 +412,220 @@ class AlphaBetaTicTacToe:
             
             # Update alpha at the root level too
             alpha = max(alpha, best_score)
-        
-        if verbose:
-            print(f"AI chooses spot {best_move} (States evaluated: {self.states_evaluated})")
+        return best_move, best_score
+
+    # ---------------------------------------------------------
+    # NEGAMAX WITH PRINCIPAL-VARIATION SEARCH
+    # ---------------------------------------------------------
+
+    def negamax(self, board, depth, player, alpha, beta, last_move=None):
+        """
+        Negamax on a BitBoard: one branch for both players, scores are from
+        the point of view of `player`, the side to move (AI scores are the
+        same as minimax_alphabeta's, negated on the human's turns).
+
+        Principal-variation search: the first (best ordered) move gets the
+        full window and every other move a null window (alpha, alpha + 1)
+        that only proves it's no better. A move that does beat alpha is
+        searched again with the full window. The best line found from here
+        is left in self._pv[depth + 1].
+        """
+        self.states_evaluated += 1
+        if depth > self._deepest:
+            self._deepest = depth
+        if self._budget is not None:
+            self._budget.check(self.states_evaluated)
+        ply = depth + 1
+        self._pv[ply] = []
+        opponent = self.human if player == self.ai else self.ai
+
+        # 1. Base Cases: only the opponent can have just won
+        if last_move is None:
+            if board.is_winner(player):
+                return self.win_score - depth
+            lost = board.is_winner(opponent)
+        else:
+            lost = board.is_winner_at(opponent, last_move)
+        if lost:
+            return -self.win_score + depth
+        if board.is_full():
+            return 0
+
+        # 2. Horizon
+        empties = board.move_count()
+        draft = empties
+        if self._depth_limit is not None:
+            draft = min(empties, self._depth_limit - depth)
+            if draft <= 0:
+                self._hit_horizon = True
+                score = self.evaluate(board)
+                return score if player == self.ai else -score
+
+        # 3. Transposition Lookup (entries are from the side to move's point of view)
+        tt = self.tt
+        if tt is not None:
+            key = (board.canonical_key() << 1) | (player == self.ai)
+            entry = tt.lookup(key)
+            if entry is not None and entry[2] >= draft:
+                if entry[2] < empties:
+                    self._hit_horizon = True
+                score = from_node_score(entry[0], depth, self.win_threshold)
+                flag = entry[1]
+                if flag == EXACT:
+                    return score
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
+        alpha_orig = alpha
 
-        return best_move
+        # 4. Principal-Variation Search
+        moves = board.get_available_moves()
+        if self.orderer is not None:
+            moves = self.orderer.order(board, moves, player, depth)
+        # On the previous depth's principal variation: its move here goes first
+        follow_pv = self._follow_pv
+        self._follow_pv = False
+        if follow_pv:
+            pv_move = self._last_pv[ply] if ply < len(self._last_pv) else None
+            if pv_move in moves:
+                moves.remove(pv_move)
+                moves.insert(0, pv_move)
+            else:
+                follow_pv = False
+        best_score = -self.win_score - 1
+        for index, move in enumerate(moves):
+            board.make_move(move, player)
+            if index == 0:
+                self._follow_pv = follow_pv
+                score = -self.negamax(board, depth + 1, opponent, -beta, -alpha, move)
+            else:
+                score = -self.negamax(board, depth + 1, opponent, -alpha - 1, -alpha, move)
+                if alpha < score < beta:
+                    self.pvs_researches += 1
+                    score = -self.negamax(board, depth + 1, opponent, -beta, -alpha, move)
+            board.unmake_move(move, player)
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+            if alpha >= beta:
+                self._record_cutoff(move, player, depth, draft, index)
+                break
+
+        if tt is not None:
+            if best_score <= alpha_orig:
+                flag = UPPER_BOUND
+            elif best_score >= beta:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            tt.store(key, to_node_score(best_score, depth, self.win_threshold), flag, draft)
+        return best_score
+
+    def _negamax_root(self, board, available_moves, alpha, beta):
+        """PVS over the root moves in (alpha, beta); returns (best_move, best_score, pv)."""
+        best_move, best_score, pv = available_moves[0], -self.win_score - 1, []
+        for index, move in enumerate(available_moves):
+            board.make_move(move, self.ai)
+            if index == 0:
+                self._follow_pv = move == self._last_pv[0] if self._last_pv else False
+                score = -self.negamax(board, 0, self.human, -beta, -alpha, move)
+            else:
+                score = -self.negamax(board, 0, self.human, -alpha - 1, -alpha, move)
+                if alpha < score < beta:
+                    self.pvs_researches += 1
+                    score = -self.negamax(board, 0, self.human, -beta, -alpha, move)
+            board.unmake_move(move, self.ai)
+
+            if score > best_score:
+                best_move, best_score = move, score
+                if score > alpha:
+                    alpha = score
+                    pv = [move] + self._pv[1]
+            if alpha >= beta:
+                break
+        return best_move, best_score, pv or [best_move]
+
+    def _negamax_search(self, board, available_moves, budget, verbose):
+        """
+        Iterative deepening over _negamax_root when there's a budget or a
+        depth_limit (a single search to the end otherwise), the same schedule
+        as the plain search. Each depth searches the last depth's principal
+        variation first, in a window of +/- ASPIRATION_WINDOW around the score
+        two plies shallower, widened step by step on the side that fails.
+        Stops at the first depth that reaches the end of every line, or when
+        the budget runs out. Returns (best_move, best_score, pv, completed_depth).
+        """
+        infinity = self.win_score + 1
+        best_move, best_score, pv = available_moves[0], None, None
+        scores = {}  # Completed depth -> root score
+        completed_depth = 0
+        self._budget = budget if budget.limited else None
+        max_depth = self._max_depth(available_moves)
+        first_depth = 1 if budget.limited or self.depth_limit is not None else max_depth
+        try:
+            for depth_limit in range(first_depth, max_depth + 1):
+                self._depth_limit = depth_limit - 1
+                # The horizon score swings with the side that moves last, so the window is
+                # centred on the score two plies shallower (same side last), if there is one
+                seed = scores.get(depth_limit - 2)
+                delta = ASPIRATION_WINDOW
+                if seed is None:
+                    alpha, beta = -infinity, infinity
+                else:
+                    alpha, beta = seed - delta, seed + delta
+                while True:
+                    self._hit_horizon = False
+                    move, score, line = self._negamax_root(board, available_moves, alpha, beta)
+                    # On a fail, move that side of the window past the score, twice as far each time
+                    if score <= alpha and alpha > -infinity:
+                        alpha = max(-infinity, score - delta)
+                    elif score >= beta and beta < infinity:
+                        beta = min(infinity, score + delta)
+                    else:
+                        break
+                    delta *= 2
+                    self.aspiration_researches += 1
+                scores[depth_limit] = score
+                best_move, best_score, pv = move, score, line
+                self._last_pv = pv
+                completed_depth = depth_limit
+                if verbose:
+                    print(f"  Depth {depth_limit}: spot {best_move} (score {best_score}, line {pv})")
+                if not self._hit_horizon:
+                    break  # Nothing was cut off: the result is exact
+                available_moves.remove(best_move)
+                available_moves.insert(0, best_move)
+        except SearchTimeout:
+            pass
+        finally:
+            self._budget = None
+            self._depth_limit = None
+            self._last_pv = []
+        return best_move, best_score, pv, completed_depth
+
+    def _max_depth(self, available_moves):
+        if self.depth_limit is None:
+            return len(available_moves)
+        return max(1, min(self.depth_limit, len(available_moves)))
+
+    def _solved_table_pv(self, board):
+        """Best line from the solved table: follow its move for each side until the game ends."""
+        board = board.copy()
+        player = self.ai
+        pv = []
+        while True:
+            entry = self.solved_table.lookup(board, player)
+            if entry is None or entry[1] is None:
+                return pv
+            pv.append(entry[1])
+            board.make_move(entry[1], player)
+            player = self.human if player == self.ai else self.ai
 
     # ---------------------------------------------------------
     # GAME LOOP
@@ -148,12 +641,12 @@ class AlphaBetaTicTacToe:
             
             # Human Turn
             try:
-                move = int(input("Enter your move (0-8): "))
+                move = int(input(f"Enter your move (0-{self.geometry.cells - 1}): "))
                 if self.board[move] != " ":
                     print("Invalid move! Spot taken.")
                     continue
             except (ValueError, IndexError):
-                print("Invalid input! Please enter a number 0-8.")
+                print(f"Invalid input! Please enter a number 0-{self.geometry.cells - 1}.")
                 continue
 
             self.board[move] = self.human
@@ -247,9 +740,11 @@ if __name__ == "__main__":
         print("="*30)
         print("1. Play against Alpha-Beta AI")
         print("2. Run Simulation (Benchmark)")
-        print("3. Exit")
+        print("3. Play 4x4 (depth-limited, static evaluation)")
+        print("4. Play 5x5 (depth-limited, static evaluation)")
+        print("5. Exit")
         
-        choice = input("Enter 1, 2, or 3: ")
+        choice = input("Enter 1-5: ")
         
         if choice == "1":
             game.play()
@@ -260,8 +755,11 @@ if __name__ == "__main__":
             except ValueError:
                 print("Invalid number!")
         elif choice == "3":
+            AlphaBetaTicTacToe(size=4, depth_limit=4).play()
+        elif choice == "4":
+            AlphaBetaTicTacToe(size=5, depth_limit=3).play()
+        elif choice == "5":
             print("Goodbye.")
             sys.exit()
         else:
             print("Invalid choice.")
-
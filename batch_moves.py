@@ -0,0 +1,60 @@
+"""
+Batch move analysis: best moves and scores for many positions in one call.
+
+iter_best_moves() takes any iterable of positions (board lists, strings
+or BitBoards, e.g. read lazily from a game log) and yields one BatchResult
+per position, in input order, as soon as it is known:
+
+    for result in engine.best_moves(positions):
+        result.index, result.move, result.score, result.cached
+
+Every position is searched in its canonical orientation (the symmetry
+with the smallest packed key, see BitBoard.canonical_form), so rotated and
+mirrored copies of a position are searched once and the answer is mapped
+back to each copy's own orientation. The batch runs on one engine, so its
+transposition table is shared by every search in it. Answers are kept in a
+bounded LRU table (cache_size positions), and nothing else is held per
+position, so memory stays flat however long the input is.
+
+The score is the engine's own (MoveResult.score): the minimax score for
+minimax / alpha-beta, the move's win rate for MCTS.
+"""
+
+from collections import OrderedDict, namedtuple
+
+from bitboard import BitBoard
+from engines import engine_board
+
+DEFAULT_CACHE_SIZE = 65536
+
+# cached: the answer came from an earlier (possibly symmetric) copy of the position
+BatchResult = namedtuple("BatchResult", "index move score cached")
+
+
+def iter_best_moves(engine, positions, player=None, time_limit_ms=None, node_limit=None,
+                    cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Generator of BatchResult for each of `positions`, searched with
+    `engine` for `player` (None: inferred per position, see
+    engines.side_to_move). Raises ValueError for a position with no move.
+    """
+    geometry = engine.geometry
+    cells = geometry.cells
+    cell_mask = (1 << cells) - 1
+    answers = OrderedDict()  # canonical key -> (move on the canonical board, score)
+    for index, position in enumerate(positions):
+        board = BitBoard.from_list(engine_board(position, player, geometry, engine.ai), geometry)
+        key, perm = board.canonical_form()
+        answer = answers.get(key)
+        cached = answer is not None
+        if cached:
+            answers.move_to_end(key)
+        else:
+            canonical = BitBoard(geometry, key & cell_mask, key >> cells)
+            result = engine.choose_move(canonical.to_list(), engine.ai, time_limit_ms, node_limit)
+            answer = (result.move, result.score)
+            answers[key] = answer
+            if len(answers) > cache_size:
+                answers.popitem(last=False)
+        # Cell i of this position is cell perm[i] of the canonical one
+        yield BatchResult(index, perm.index(answer[0]), answer[1], cached)
@@ -0,0 +1,79 @@
+"""
+Vectorized MCTS rollouts (needs NumPy).
+
+Instead of playing one random game at a time, a leaf is evaluated by
+playing `count` random continuations at once. A random continuation is
+just a random order of the empty cells, with the two players taking turns,
+so every game is one row of a (count, empty cells) permutation matrix.
+
+Win detection is vectorized over the precomputed segment table: for each
+game and segment we know whether one player owns the whole segment and at
+which ply it was completed. The winner of a game is whoever completed a
+segment first; a game where nobody does is a draw.
+"""
+
+import numpy as np
+
+NEVER = np.iinfo(np.int16).max  # "Segment never completed"
+
+_SEGMENT_ARRAYS = {}
+
+
+def get_segment_array(geometry):
+    """The geometry's winning segments as a (segments, k) index array, built once."""
+    segments = _SEGMENT_ARRAYS.get(geometry)
+    if segments is None:
+        segments = np.array(geometry.segments, dtype=np.intp)
+        _SEGMENT_ARRAYS[geometry] = segments
+    return segments
+
+
+def batch_rollouts(board, player_to_move, count, rng):
+    """
+    Plays `count` uniformly random games from a BitBoard with
+    `player_to_move` ("X" or "O") to play.
+    Returns (x_wins, o_wins, draws, plies), plies being the moves played
+    over all games (a drawn game counts every empty cell).
+    """
+    geometry = board.geometry
+    cells = geometry.cells
+    empties = np.array(board.get_available_moves(), dtype=np.intp)
+    n_empty = len(empties)
+
+    # Owner per cell: 1 = X, 2 = O, 0 = empty. Ply per cell: -1 = already on the board
+    owner = np.zeros((count, cells), dtype=np.int8)
+    ply = np.full((count, cells), -1, dtype=np.int16)
+    for cell in range(cells):
+        if board.x_bits >> cell & 1:
+            owner[:, cell] = 1
+        elif board.o_bits >> cell & 1:
+            owner[:, cell] = 2
+
+    if n_empty:
+        # Row g is the order game g fills the empty cells in
+        order = rng.random((count, n_empty)).argsort(axis=1)
+        cells_played = empties[order]
+        plies = np.broadcast_to(np.arange(n_empty, dtype=np.int16), (count, n_empty))
+        rows = np.arange(count)[:, None]
+        ply[rows, cells_played] = plies
+        first, second = (1, 2) if player_to_move == "X" else (2, 1)
+        owner[rows, cells_played] = np.where(plies % 2 == 0, first, second)
+
+    segments = get_segment_array(geometry)
+    seg_owner = owner[:, segments]  # (count, segments, k)
+    seg_done = ply[:, segments].max(axis=2)  # Ply each segment was filled on
+
+    x_full = (seg_owner == 1).all(axis=2)
+    o_full = (seg_owner == 2).all(axis=2)
+    x_first = np.where(x_full, seg_done, NEVER).min(axis=1)
+    o_first = np.where(o_full, seg_done, NEVER).min(axis=1)
+
+    x_wins = int(np.count_nonzero(x_first < o_first))
+    o_wins = int(np.count_nonzero(o_first < x_first))
+    ended = np.minimum(x_first, o_first)
+    plies = int(np.where(ended == NEVER, n_empty, ended.astype(np.int64) + 1).sum())
+    return x_wins, o_wins, count - x_wins - o_wins, plies
+
+
+def make_rng(seed=None):
+    return np.random.default_rng(seed)
@@ -0,0 +1,277 @@
+"""
+Benchmark suite: per-move latency, search speed and memory of every engine.
+
+Each case runs one engine on a fixed corpus of positions for one board
+size. The corpus is generated from a fixed seed (random legal play, X to
+move, game not over), so every run measures the same work. Per case we
+record:
+
+    p50 / p95 / p99 latency per move (ms), mean latency. Each position is
+    timed `repeat` times and its fastest run is kept, which filters out
+    scheduler noise; moves under a millisecond are timed in a loop.
+    nodes per move and nodes/sec (iterations for MCTS)
+    peak traced memory of one pass over the corpus (tracemalloc)
+
+Results are compared against a committed baseline (benchmark_baseline.json).
+A case regresses when its p50 or p95 latency, its peak memory or its
+nodes per move grows, or its nodes/sec drops, by more than the tolerance;
+p99 is reported but too noisy on small corpora to gate on. Nodes per move
+is deterministic (fixed corpus and seeds), so extra search work shows up
+there even when the timings are noisy. A case that regresses is run again (up
+to --retries times, keeping its best numbers) before it counts, and the
+baseline itself is the median of several runs, so one noisy run neither
+fails the check nor sets the bar. The script exits with status 1 when
+anything regressed. Timings are machine-specific: record the baseline on
+the machine that runs the check.
+
+    python3 benchmark.py                        # compare against the baseline
+    python3 benchmark.py --update-baseline      # record a new baseline
+    python3 benchmark.py --case mcts-4x4 --tolerance 0.5
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from bitboard import BitBoard
+from geometry import get_geometry
+from simulation_runner import make_engine
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_TOLERANCE = 0.5
+CORPUS_SEED = 2024
+
+# name: (engine, board size, constructor options, move options, corpus size)
+# The solved table is off so minimax / alpha-beta measure their search.
+CASES = {
+    "heuristic-3x3": ("heuristic", 3, {}, {}, 40),
+    "heuristic-4x4": ("heuristic", 4, {}, {}, 30),
+    "heuristic-5x5": ("heuristic", 5, {}, {}, 20),
+    "minimax-3x3": ("minimax", 3, {"use_solved_table": False}, {}, 40),
+    "alphabeta-3x3": ("alphabeta", 3, {"use_solved_table": False, "shuffle_root": False}, {}, 40),
+    "alphabeta-4x4": ("alphabeta", 4, {"depth_limit": 4, "shuffle_root": False}, {}, 30),
+    "alphabeta-5x5": ("alphabeta", 5, {"depth_limit": 3, "shuffle_root": False}, {}, 20),
+    "mcts-3x3": ("mcts", 3, {"reuse_tree": False}, {"iterations": 500}, 40),
+    "mcts-4x4": ("mcts", 4, {"reuse_tree": False}, {"iterations": 1000}, 30),
+    "mcts-5x5": ("mcts", 5, {"reuse_tree": False}, {"iterations": 1000}, 20),
+}
+
+
+def make_corpus(geometry, count, seed=CORPUS_SEED):
+    """`count` positions (as board lists) with X to move and the game still open."""
+    rng = random.Random(seed * 1000 + geometry.cells)
+    positions = []
+    while len(positions) < count:
+        board = BitBoard(geometry)
+        player = rng.choice(("X", "O"))  # Either side may have started
+        over = False
+        for _ in range(rng.randrange(geometry.cells - 1)):
+            move = rng.choice(board.get_available_moves())
+            board.make_move(move, player)
+            if board.is_winner_at(player, move) or board.is_full():
+                over = True
+                break
+            player = "O" if player == "X" else "X"
+        if not over and player == "X":
+            positions.append(board.to_list())
+    return positions
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1
+    return sorted_values[index]
+
+
+# Moves faster than this are timed as a loop of calls (per-call overhead of the timer and noise)
+MIN_SAMPLE_SECONDS = 0.005
+
+
+def _time_move(engine, get_move, counter, board, move_options, calls=1):
+    """Seconds per call and nodes per call of `calls` searches from `board`."""
+    tt = getattr(engine, "tt", None)
+    nodes = 0
+    elapsed = 0.0
+    for _ in range(calls):
+        engine.board = board[:]
+        if tt is not None:
+            tt.clear()  # Every search starts cold, so runs don't depend on order
+        setattr(engine, counter, 0)
+        start = time.perf_counter()
+        get_move(verbose=False, **move_options)
+        elapsed += time.perf_counter() - start
+        nodes += getattr(engine, counter)
+    return elapsed / calls, nodes / calls
+
+
+def run_case(name, repeat=5, seed=0):
+    """Runs one benchmark case and returns its metrics."""
+    engine_name, size, options, move_options, count = CASES[name]
+    geometry = get_geometry(size)
+    corpus = make_corpus(geometry, count)
+    engine, get_move, counter = make_engine(engine_name, geometry, **options)
+
+    latencies = []
+    nodes = 0
+    for index, board in enumerate(corpus):
+        random.seed(seed + index)
+        elapsed, _ = _time_move(engine, get_move, counter, board, move_options)
+        calls = 1 if elapsed >= MIN_SAMPLE_SECONDS else math.ceil(MIN_SAMPLE_SECONDS / max(elapsed, 1e-7))
+        best = None
+        for run in range(repeat):
+            random.seed(seed + index)  # Same search every run (MCTS)
+            elapsed, move_nodes = _time_move(engine, get_move, counter, board, move_options, calls)
+            if best is None or elapsed < best:
+                best = elapsed
+        latencies.append(best)
+        nodes += move_nodes
+
+    # Memory is measured on a separate pass: tracing slows everything down
+    tracemalloc.start()
+    try:
+        for index, board in enumerate(corpus):
+            random.seed(seed + index)
+            _time_move(engine, get_move, counter, board, move_options)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if hasattr(engine, "close"):
+        engine.close()
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "engine": engine_name,
+        "board": geometry.label,
+        "positions": len(corpus),
+        "repeat": repeat,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000.0, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000.0, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000.0, 4),
+        "mean_ms": round(total * 1000.0 / len(latencies), 4),
+        "nodes_per_move": round(nodes / len(latencies), 2),
+        "nodes_per_sec": round(nodes / total, 1) if total else 0.0,
+        "peak_memory_kb": round(peak / 1024.0, 1),
+    }
+
+
+# Metrics compared against the baseline, and which way is better
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "peak_memory_kb", "nodes_per_move")
+HIGHER_IS_BETTER = ("nodes_per_sec",)
+
+
+def best_of(runs):
+    """Merges several results of one case, keeping the best value of each metric."""
+    merged = dict(runs[0])
+    for metric in LOWER_IS_BETTER:
+        merged[metric] = min(run[metric] for run in runs)
+    for metric in HIGHER_IS_BETTER:
+        merged[metric] = max(run[metric] for run in runs)
+    return merged
+
+
+def median_of(runs):
+    """Merges several results of one case, keeping the median of each metric."""
+    merged = dict(runs[0])
+    for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        values = sorted(run[metric] for run in runs)
+        merged[metric] = values[len(values) // 2]
+    return merged
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns a list of regression messages: results slower (or bigger) than
+    the baseline by more than `tolerance` (0.5 = 50%).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "peak_memory_kb", "nodes_per_move"):
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {result[metric]} vs baseline {base[metric]}")
+        if result["nodes_per_sec"] * (1 + tolerance) < base["nodes_per_sec"]:
+            regressions.append(f"{name}: nodes_per_sec {result['nodes_per_sec']} vs baseline {base['nodes_per_sec']}")
+    return regressions
+
+
+def _print_result(name, result):
+    print(f"{name:15} p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  "
+          f"p99 {result['p99_ms']:9.3f} ms  {result['nodes_per_sec']:11.0f} nodes/s  "
+          f"peak {result['peak_memory_kb']:8.1f} KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine benchmarks with baseline regression checks.")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="Case to run (repeatable, default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per position (the fastest counts)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown as a fraction (default 0.5)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--baseline-runs", type=int, default=3,
+                        help="Runs per case whose median becomes the baseline")
+    parser.add_argument("--retries", type=int, default=2, help="Reruns of a regressed case before it counts")
+    parser.add_argument("--output", default=None, help="Also write the compared results as JSON here")
+    args = parser.parse_args(argv)
+
+    names = args.case or list(CASES)
+    runs = max(1, args.baseline_runs) if args.update_baseline else 1
+    results = {}
+    for name in names:
+        results[name] = median_of([run_case(name, args.repeat) for _ in range(runs)])
+        _print_result(name, results[name])
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline first.")
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        regressed = {message.split(":")[0] for message in regressions}
+        print(f"\nRe-running {', '.join(sorted(regressed))}")
+        for name in sorted(regressed):
+            results[name] = best_of([results[name], run_case(name, args.repeat)])
+            _print_result(name, results[name])
+        regressions = compare(results, baseline, args.tolerance)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Shared board core used by every engine.
+
+The board is kept as two integers (one bitmask per player). Bit i is set
+when that player owns cell i, using the same row-major numbering as the
+list boards (0 is top-left). Winning segments and their masks come from
+the board's BoardGeometry (see geometry.py), built once per (rows, cols, k)
+and shared by every board of that shape.
+"""
+
+import random
+
+from geometry import BoardGeometry, get_geometry
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(value):
+        return bin(value).count("1")
+
+
+_SYMMETRY_TABLES = {}
+
+
+def get_symmetry_tables(geometry):
+    """
+    Byte lookup tables for mapping a packed position (x_bits | o_bits << cells)
+    through each symmetry of the board. tables[sym][chunk][byte] is the
+    transformed value of that byte of the key, so a whole key is transformed
+    with one lookup per 8 bits instead of one step per cell.
+    """
+    tables = _SYMMETRY_TABLES.get(geometry)
+    if tables is None:
+        cells = geometry.cells
+        chunks = (2 * cells + 7) // 8
+        tables = []
+        for perm in geometry.symmetries:
+            # Bit i of the packed key moves to bit full_perm[i]
+            full_perm = perm + tuple(cells + p for p in perm)
+            sym_tables = []
+            for chunk in range(chunks):
+                table = [0] * 256
+                for byte in range(256):
+                    mapped = 0
+                    for bit in range(8):
+                        src = chunk * 8 + bit
+                        if byte >> bit & 1 and src < 2 * cells:
+                            mapped |= 1 << full_perm[src]
+                    table[byte] = mapped
+                sym_tables.append(tuple(table))
+            tables.append(tuple(sym_tables))
+        tables = tuple(tables)
+        _SYMMETRY_TABLES[geometry] = tables
+    return tables
+
+
+_ZOBRIST_KEYS = {}
+
+
+def get_zobrist_keys(geometry):
+    """
+    (x_keys, o_keys): a random 64-bit key per cell for each player. A
+    position's Zobrist hash is the XOR of the keys of its pieces, so a move
+    updates it with one XOR. The keys are drawn from an RNG seeded with the
+    board shape, so hashes are the same in every process and run.
+    """
+    keys = _ZOBRIST_KEYS.get(geometry)
+    if keys is None:
+        rng = random.Random(f"zobrist {geometry.rows}x{geometry.cols}x{geometry.k}")
+        keys = tuple(tuple(rng.getrandbits(64) for _ in range(geometry.cells)) for _ in "XO")
+        _ZOBRIST_KEYS[geometry] = keys
+    return keys
+
+
+def _square_geometry(board_state):
+    return get_geometry(int(round(len(board_state) ** 0.5)))
+
+
+def list_is_winner(player, board_state, geometry=None):
+    """
+    Win check for the list-of-strings boards used by the game loops.
+    Without a geometry the board is taken to be a square with full-row wins.
+    """
+    if geometry is None:
+        geometry = _square_geometry(board_state)
+    for segment in geometry.segments:
+        for cell in segment:
+            if board_state[cell] != player:
+                break
+        else:
+            return True
+    return False
+
+
+def print_list_board(board_state, geometry=None):
+    """
+    Prints a list-of-strings board as a grid, e.g. " X | O |   " rows split
+    by "---+---+---".
+    """
+    if geometry is None:
+        geometry = _square_geometry(board_state)
+    cols = geometry.cols
+    print("\n")
+    for row in range(geometry.rows):
+        start = row * cols
+        print(" " + " | ".join(board_state[start:start + cols]) + " ")
+        if row < geometry.rows - 1:
+            print("+".join(["---"] * cols))
+    print("\n")
+
+
+class BitBoard:
+
+    def __init__(self, geometry=3, x_bits=0, o_bits=0):
+        # geometry is a BoardGeometry, or a side length for a classic square board
+        if not isinstance(geometry, BoardGeometry):
+            geometry = get_geometry(geometry)
+        self.geometry = geometry
+        self.cells = geometry.cells
+        self.full_mask = geometry.full_mask
+        self.win_masks = geometry.segment_masks
+        self.cell_masks = geometry.cell_masks
+        self.x_bits = x_bits
+        self.o_bits = o_bits
+
+    @classmethod
+    def from_list(cls, board_state, geometry=None):
+        """
+        Builds a BitBoard from a list of " "/"X"/"O" strings.
+        """
+        if geometry is None:
+            geometry = _square_geometry(board_state)
+        x_bits = 0
+        o_bits = 0
+        for i, spot in enumerate(board_state):
+            if spot == "X":
+                x_bits |= 1 << i
+            elif spot == "O":
+                o_bits |= 1 << i
+        return cls(geometry, x_bits, o_bits)
+
+    def to_list(self):
+        board_state = [" "] * self.cells
+        for i in range(self.cells):
+            bit = 1 << i
+            if self.x_bits & bit:
+                board_state[i] = "X"
+            elif self.o_bits & bit:
+                board_state[i] = "O"
+        return board_state
+
+    def copy(self):
+        return BitBoard(self.geometry, self.x_bits, self.o_bits)
+
+    def player_bits(self, player):
+        return self.x_bits if player == "X" else self.o_bits
+
+    # ---------------------------------------------------------
+    # MAKE / UNMAKE
+    # ---------------------------------------------------------
+
+    def make_move(self, cell, player):
+        if player == "X":
+            self.x_bits |= 1 << cell
+        else:
+            self.o_bits |= 1 << cell
+
+    def unmake_move(self, cell, player):
+        if player == "X":
+            self.x_bits &= ~(1 << cell)
+        else:
+            self.o_bits &= ~(1 << cell)
+
+    # ---------------------------------------------------------
+    # QUERIES
+    # ---------------------------------------------------------
+
+    def is_winner(self, player):
+        bits = self.x_bits if player == "X" else self.o_bits
+        for mask in self.win_masks:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def is_winner_at(self, player, cell):
+        """
+        Win check after `player` moved on `cell`: only the segments through
+        that cell can have just been completed.
+        """
+        bits = self.x_bits if player == "X" else self.o_bits
+        for mask in self.cell_masks[cell]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def winner(self):
+        """Returns "X", "O" or None."""
+        if self.is_winner("X"):
+            return "X"
+        if self.is_winner("O"):
+            return "O"
+        return None
+
+    def is_full(self):
+        return (self.x_bits | self.o_bits) == self.full_mask
+
+    def empty_mask(self):
+        return self.full_mask & ~(self.x_bits | self.o_bits)
+
+    def move_count(self):
+        """Number of empty cells."""
+        return popcount(self.empty_mask())
+
+    def pieces_played(self):
+        return popcount(self.x_bits | self.o_bits)
+
+    def get_available_moves(self):
+        """
+        Lists empty cells in index order. The list is sized up front from the
+        popcount and filled by peeling off the lowest set bit each step.
+        """
+        empty = self.empty_mask()
+        moves = [0] * popcount(empty)
+        i = 0
+        while empty:
+            low = empty & -empty
+            moves[i] = low.bit_length() - 1
+            empty ^= low
+            i += 1
+        return moves
+
+    # ---------------------------------------------------------
+    # SYMMETRY
+    # ---------------------------------------------------------
+
+    def packed_key(self):
+        """Both bitmasks packed into one int: x_bits | o_bits << cells."""
+        return self.x_bits | (self.o_bits << self.cells)
+
+    def canonical_key(self):
+        """
+        Smallest packed key over the board symmetries, so rotated and
+        mirrored copies of a position share one key.
+        """
+        key = self.packed_key()
+        best = None
+        for sym_tables in get_symmetry_tables(self.geometry):
+            mapped = 0
+            rest = key
+            for table in sym_tables:
+                mapped |= table[rest & 255]
+                rest >>= 8
+            if best is None or mapped < best:
+                best = mapped
+        return best
+
+    def canonical_form(self):
+        """
+        (canonical_key(), perm): also the symmetry (geometry.symmetries) that
+        takes this board to the canonical one, so cell i of this board is
+        cell perm[i] there.
+        """
+        key = self.packed_key()
+        best = best_perm = None
+        for perm, sym_tables in zip(self.geometry.symmetries, get_symmetry_tables(self.geometry)):
+            mapped = 0
+            rest = key
+            for table in sym_tables:
+                mapped |= table[rest & 255]
+                rest >>= 8
+            if best is None or mapped < best:
+                best, best_perm = mapped, perm
+        return best, best_perm
+
+    # ---------------------------------------------------------
+    # HASHING
+    # ---------------------------------------------------------
+
+    def zobrist_hash(self):
+        """XOR of the Zobrist keys (get_zobrist_keys) of every piece on the board."""
+        x_keys, o_keys = get_zobrist_keys(self.geometry)
+        key = 0
+        for keys, bits in ((x_keys, self.x_bits), (o_keys, self.o_bits)):
+            while bits:
+                low = bits & -bits
+                key ^= keys[low.bit_length() - 1]
+                bits ^= low
+        return key
+
+    def __eq__(self, other):
+        return (isinstance(other, BitBoard) and self.geometry is other.geometry
+                and self.x_bits == other.x_bits and self.o_bits == other.o_bits)
+
+    def __hash__(self):
+        return hash((self.geometry.rows, self.geometry.cols, self.geometry.k, self.x_bits, self.o_bits))
+
+    def __repr__(self):
+        return f"BitBoard({self.geometry!r}, x_bits={self.x_bits:#x}, o_bits={self.o_bits:#x})"
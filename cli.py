@@ -0,0 +1,242 @@
+"""
+Non-interactive command line for every engine.
+
+Ask an engine for one move:
+
+    python3 cli.py --engine alphabeta --position "X.O.X...." --format json
+    python3 cli.py --engine mcts --rows 4 --k 3 --position "X...O..........." --node-limit 5000
+
+or play games against a random player (or another engine), alternating
+who starts:
+
+    python3 cli.py --engine heuristic --games 100
+    python3 cli.py --engine mcts --opponent alphabeta --games 10 --time-limit-ms 50
+
+or analyze a file of positions (one per line, '-' for stdin), streaming
+one result per line:
+
+    python3 cli.py --engine alphabeta --positions game_log.txt --format json
+
+Positions are row by row, with ' ', '.', '_' or '-' for empty cells ('/'
+and '|' between rows are ignored); the side to move is inferred from the
+piece counts unless --player is given. --option KEY=VALUE passes
+constructor options (e.g. --option depth_limit=4 --option workers=4).
+
+Engines are looked up in the registry (engines.py) and imported only when
+used, so a heuristic call doesn't load the search engines. For large
+parallel simulations use simulation_runner.py.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import deque
+
+from batch_moves import iter_best_moves
+from bitboard import BitBoard
+from engines import MoveResult, create_engine, engine_names
+from geometry import get_geometry
+
+
+class RandomPlayer:
+    """Uniformly random legal moves, behind the same choose_move protocol."""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose_move(self, board, player=None, time_limit_ms=None, node_limit=None):
+        return MoveResult(self.rng.choice([i for i, spot in enumerate(board) if spot == " "]), None)
+
+
+def parse_position(text):
+    return [" " if spot in ".-_" else spot.upper() for spot in text if spot not in "/|"]
+
+
+def parse_options(pairs):
+    """KEY=VALUE strings as constructor keyword arguments (values read as JSON when they parse)."""
+    options = {}
+    for pair in pairs or ():
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Option {pair!r} is not KEY=VALUE")
+        try:
+            options[key] = json.loads(value)
+        except ValueError:
+            options[key] = value
+    return options
+
+
+def _budget(args):
+    return {"time_limit_ms": args.time_limit_ms, "node_limit": args.node_limit}
+
+
+def run_move(args, geometry):
+    engine = create_engine(args.engine, geometry, **parse_options(args.option))
+    try:
+        board = parse_position(args.position)
+        result = engine.choose_move(board, args.player, **_budget(args))
+    finally:
+        if hasattr(engine, "close"):
+            engine.close()
+    return {
+        "engine": args.engine,
+        "board": geometry.label,
+        "move": result.move,
+        "row": result.move // geometry.cols,
+        "col": result.move % geometry.cols,
+        "stats": result.stats.as_dict(),
+    }
+
+
+def run_games(args, geometry):
+    # Engines use the global `random`; the random opponent gets its own stream
+    random.seed(args.seed)
+    engine = create_engine(args.engine, geometry, **parse_options(args.option))
+    if args.opponent == "random":
+        opponent = RandomPlayer(random.Random(args.seed ^ 0x5EED))
+    else:
+        opponent = create_engine(args.opponent, geometry)
+
+    totals = {"wins": 0, "losses": 0, "draws": 0, "moves": 0, "nodes": 0, "move_time_s": 0.0}
+    try:
+        for game_num in range(1, args.games + 1):
+            for player in (engine, opponent):
+                if hasattr(player, "reset_board"):
+                    player.reset_board()
+            board = BitBoard(geometry)
+            # Alternate the starting player, the engine starts odd games (X always moves first here)
+            engine_turn = game_num % 2 == 1
+            piece = "X"
+            while True:
+                if engine_turn:
+                    start = time.perf_counter()
+                    result = engine.choose_move(board.to_list(), piece, **_budget(args))
+                    totals["move_time_s"] += time.perf_counter() - start
+                    totals["nodes"] += result.stats.nodes
+                    move = result.move
+                    totals["moves"] += 1
+                else:
+                    move = opponent.choose_move(board.to_list(), piece, **_budget(args)).move
+                board.make_move(move, piece)
+
+                if board.is_winner_at(piece, move):
+                    totals["wins" if engine_turn else "losses"] += 1
+                    break
+                if board.is_full():
+                    totals["draws"] += 1
+                    break
+                engine_turn = not engine_turn
+                piece = "O" if piece == "X" else "X"
+    finally:
+        for player in (engine, opponent):
+            if hasattr(player, "close"):
+                player.close()
+
+    games, moves = args.games, totals["moves"]
+    return {
+        "engine": args.engine,
+        "opponent": args.opponent,
+        "board": geometry.label,
+        "games": games,
+        "wins": totals["wins"],
+        "losses": totals["losses"],
+        "draws": totals["draws"],
+        "win_rate": totals["wins"] / games if games else 0.0,
+        "nodes_per_move": totals["nodes"] / moves if moves else 0.0,
+        "ms_per_move": totals["move_time_s"] * 1000.0 / moves if moves else 0.0,
+        "seed": args.seed,
+    }
+
+
+def run_batch(args, geometry, out):
+    """Streams one result per position line (batch_moves.py); returns how many were written."""
+    engine = create_engine(args.engine, geometry, **parse_options(args.option))
+    source = sys.stdin if args.positions == "-" else open(args.positions)
+    pending = deque()  # Positions read but not answered yet (one at a time: the batch is lazy)
+
+    def read_positions():
+        for line in source:
+            line = line.strip()
+            if line:
+                pending.append(line)
+                yield parse_position(line)
+
+    count = 0
+    try:
+        for result in iter_best_moves(engine, read_positions(), args.player, **_budget(args)):
+            position = pending.popleft()
+            if args.format == "json":
+                out.write(json.dumps({"index": result.index, "position": position, "move": result.move,
+                                      "score": result.score, "cached": result.cached}) + "\n")
+            else:
+                out.write(f"{position} {result.move} {result.score}\n")
+            count += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if hasattr(engine, "close"):
+            engine.close()
+    return count
+
+
+def format_text(result):
+    if "move" in result:
+        stats = result["stats"]
+        return (f"{result['engine']} on {result['board']}: move {result['move']} "
+                f"(row {result['row'] + 1}, col {result['col'] + 1})\n"
+                f"  nodes {stats['nodes']}, depth {stats['max_depth']}, {stats['wall_time_ms']} ms")
+    return (f"{result['engine']} vs {result['opponent']} on {result['board']}, {result['games']} games: "
+            f"{result['wins']} wins, {result['losses']} losses, {result['draws']} draws\n"
+            f"  {result['ms_per_move']:.3f} ms/move, {result['nodes_per_move']:.1f} nodes/move")
+
+
+def main(argv=None):
+    names = engine_names()
+    parser = argparse.ArgumentParser(description="Run a tic-tac-toe engine without prompts.")
+    parser.add_argument("--engine", choices=names, default="alphabeta")
+    parser.add_argument("--rows", "--size", type=int, default=3, help="Board rows (--size N: N x N board)")
+    parser.add_argument("--cols", type=int, default=None, help="Default: same as rows")
+    parser.add_argument("--k", type=int, default=None, help="In a row to win (default: shorter side)")
+    parser.add_argument("--time-limit-ms", type=int, default=None, help="Per-move search budget")
+    parser.add_argument("--node-limit", type=int, default=None,
+                        help="Per-move node budget (MCTS: iterations)")
+    parser.add_argument("--position", default=None, help="Choose one move in this position instead of playing games")
+    parser.add_argument("--player", choices=("X", "O"), default=None,
+                        help="Side to move in --position (default: from the piece counts)")
+    parser.add_argument("--positions", default=None,
+                        help="File of positions, one per line ('-': stdin), to analyze in one batch")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--opponent", choices=["random"] + names, default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--option", action="append", metavar="KEY=VALUE", help="Engine constructor option (repeatable)")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    parser.add_argument("--output", default=None, help="Write the result here instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        geometry = get_geometry(args.rows, args.cols, args.k)
+        if args.positions is not None:
+            out = open(args.output, "w") if args.output else sys.stdout
+            try:
+                run_batch(args, geometry, out)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            return 0
+        result = run_move(args, geometry) if args.position is not None else run_games(args, geometry)
+    except (TypeError, ValueError) as error:
+        parser.error(str(error))
+
+    text = json.dumps(result, indent=2) if args.format == "json" else format_text(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
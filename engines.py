@@ -0,0 +1,95 @@
+"""
+Common engine interface and registry.
+
+Every engine class implements the same protocol:
+
+    engine = EngineClass(geometry=...)
+    result = engine.choose_move(board, player=None, time_limit_ms=None, node_limit=None)
+    result.move   # cell index
+    result.stats  # SearchStats of that search (search_stats.py)
+    result.score  # the engine's score of the move (scale differs per engine)
+
+`board` is a list (or string) of " "/"X"/"O" cells, or a BitBoard;
+`player` is the side to move ("X" or "O", inferred from the piece counts
+when None). Budgets an engine has no use for are ignored (the heuristic
+engine), and MCTS reads node_limit as its iteration count.
+
+Engines are registered by name and their modules are only imported when
+an engine is first created, so tools that use the heuristic engine never
+load the search engines (or NumPy).
+"""
+
+import importlib
+from collections import namedtuple
+
+# score: the engine's evaluation of the move for the side to move (None if it has none)
+MoveResult = namedtuple("MoveResult", "move stats score", defaults=(None,))
+
+# module / class implementing the engine, its native move method and its node counter attribute
+EngineSpec = namedtuple("EngineSpec", "module class_name move_method counter")
+
+ENGINES = {
+    "heuristic": EngineSpec("heuristic_tictactoe", "HeuristicTicTacToe", "get_heuristic_move", "nodes_evaluated"),
+    "minimax": EngineSpec("minimax_tictactoe", "MinimaxTicTacToe", "get_minimax_move", "nodes_evaluated"),
+    "alphabeta": EngineSpec("alphabeta_tictactoe", "AlphaBetaTicTacToe", "get_best_move", "states_evaluated"),
+    "mcts": EngineSpec("mcts_tictactoe", "MCTSTicTacToe", "get_mcts_move", "iterations_run"),
+}
+
+
+def register_engine(name, module, class_name, move_method, counter):
+    """Adds (or replaces) an engine; the module is imported on first use."""
+    ENGINES[name] = EngineSpec(module, class_name, move_method, counter)
+
+
+def engine_names():
+    return sorted(ENGINES)
+
+
+def get_engine_spec(name):
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown engine {name!r}, expected one of {', '.join(engine_names())}") from None
+
+
+def get_engine_class(name):
+    spec = get_engine_spec(name)
+    return getattr(importlib.import_module(spec.module), spec.class_name)
+
+
+def create_engine(name, geometry=None, **options):
+    """Builds the engine registered as `name`; `options` go to its constructor."""
+    return get_engine_class(name)(geometry=geometry, **options)
+
+
+# ---------------------------------------------------------
+# POSITIONS
+# ---------------------------------------------------------
+
+def side_to_move(board_state):
+    """X unless X already has more pieces than O (either side may have started)."""
+    return "O" if board_state.count("X") > board_state.count("O") else "X"
+
+
+def engine_board(board, player, geometry, ai="X"):
+    """
+    The position as a board list for an engine that always plays `ai`.
+    When `player` (None: side_to_move) isn't `ai` the pieces are swapped,
+    which gives the same game from the other side. Raises ValueError for
+    a board of the wrong size or with no empty cell.
+    """
+    if hasattr(board, "to_list"):
+        board = board.to_list()
+    board_state = [" " if spot in (" ", ".", "_", "-") else spot for spot in board]
+    if len(board_state) != geometry.cells:
+        raise ValueError(f"Board has {len(board_state)} cells, expected {geometry.cells} for {geometry.label}")
+    if any(spot not in (" ", "X", "O") for spot in board_state):
+        raise ValueError("Board cells must be ' ', 'X' or 'O'")
+    if " " not in board_state:
+        raise ValueError("Board is full, there is no move to make")
+    if player is None:
+        player = side_to_move(board_state)
+    if player != ai:
+        swap = {"X": "O", "O": "X", " ": " "}
+        board_state = [swap[spot] for spot in board_state]
+    return board_state
@@ -0,0 +1,553 @@
+"""
+Asyncio game server: many concurrent games against any engine.
+
+The protocol is JSON lines over TCP: one request object per line, and one
+response line per request, in order. Every response echoes the request's
+"id" and has "ok"; failures add "error" (a message) and "code" (one of
+bad_request, not_found, busy, deadline, server_error). server_error means
+the server failed, not the request: a search worker died (the pool is
+restarted) or an engine raised.
+
+    {"op": "new", "engine": "mcts", "rows": 4, "k": 3, "ai_first": true,
+     "options": {"compact_tree": true}, "time_limit_ms": 100, "node_limit": null}
+        -> {"ok": true, "session": "...", "board": "....X...........", "status": "playing", "ai_move": 5, ...}
+    {"op": "move", "session": "...", "cell": 3}
+        -> the human's (O) move, then the AI's (X) reply with its search stats
+    {"op": "state", "session": "..."}
+    {"op": "close", "session": "..."}
+    {"op": "stats"}
+    {"op": "ping"}
+
+Each session holds only its board and engine settings. Searches run in a
+process pool, so the event loop never blocks on them; a worker keeps one
+engine per (engine, board, options), so solved tables and transposition
+tables are loaded once per worker. The heuristic engine is cheap enough to
+run inline.
+
+Clients may only set the engine options listed in CLIENT_OPTIONS, with
+the right types; anything else is refused with bad_request, as are boards
+past the server's max_cells and a time_limit_ms / node_limit that isn't a
+positive number. Options that
+touch the server's files or resources (a position store, the solved-table
+path, worker pools, table sizes) are server configuration:
+
+    python3 game_server.py --position-store positions.sqlite
+
+Backpressure: at most max_pending searches are queued or running at once;
+past that a request is refused straight away with code "busy" rather than
+queued without bound. Each connection is served one request at a time, so
+a client that doesn't read its responses stops being read from.
+
+Deadlines: a request may carry "deadline_ms" (default: the server's). The
+AI reply must arrive within it, including time spent waiting for the
+session or the pool. Every search is given the time left as its time limit
+(a session's own time_limit_ms is clipped to it), so no search holds a
+worker past its deadline, and one still queued when its deadline passes
+is dropped unrun. When the deadline is missed the request fails with code
+"deadline" and the board is left as it was, so the move can be sent again.
+
+    python3 game_server.py --port 8765 --workers 4
+    python3 load_client.py --port 8765 --connections 64 --engine mcts
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from bitboard import BitBoard
+from engines import create_engine, get_engine_spec
+from geometry import get_geometry
+from rollout_policy import ROLLOUT_POLICIES
+
+DEFAULT_PORT = 8765
+DEFAULT_DEADLINE_MS = 5000
+INLINE_ENGINES = ("heuristic",)  # Searched on the event loop (well under a millisecond)
+MCTS_DEFAULT_ITERATIONS = 1000  # MCTSTicTacToe.get_mcts_move's default
+DEADLINE_MARGIN_MS = 10  # Kept back from a clipped time limit for the trip back from the worker
+DEFAULT_MAX_CELLS = 100  # Largest board (rows * cols) a client may ask for
+WORKER_ENGINES = 32  # Engines (with their tables) a worker keeps, least recently used dropped first
+
+# Engine options a client may set in "new", with the types they must have. Anything
+# else (store and table paths, worker pools, table sizes) is server configuration
+CLIENT_OPTIONS = {
+    "heuristic": {},
+    "minimax": {"use_transposition": bool, "use_solved_table": bool},
+    "alphabeta": {"use_transposition": bool, "use_solved_table": bool, "move_ordering": bool,
+                  "shuffle_root": bool, "negamax": bool, "depth_limit": int, "static_eval": bool},
+    "mcts": {"reuse_tree": bool, "compact_tree": bool, "rave": bool, "solver": bool, "transpositions": bool,
+             "rollout_policy": str},
+}
+
+
+class RequestError(Exception):
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+# ---------------------------------------------------------
+# WORKER SIDE
+# ---------------------------------------------------------
+
+_worker_engines = OrderedDict()
+
+
+def _engine_for(name, shape, options_key):
+    key = (name, shape, options_key)
+    engine = _worker_engines.get(key)
+    if engine is None:
+        engine = create_engine(name, get_geometry(*shape), **json.loads(options_key))
+        _worker_engines[key] = engine
+        if len(_worker_engines) > WORKER_ENGINES:
+            _, dropped = _worker_engines.popitem(last=False)
+            close = getattr(dropped, "close", None)
+            if close is not None:
+                close()  # MCTS worker pools
+    else:
+        _worker_engines.move_to_end(key)
+    return engine
+
+
+def search_move(name, shape, options_key, board_state, time_limit_ms, node_limit, deadline):
+    """
+    Runs one search (in a pool worker, or inline) and returns
+    (move, stats dict), or None when the wall-clock `deadline` has already
+    passed (the request was given up on while this sat in the queue).
+    """
+    if deadline is not None:
+        remaining_ms = (deadline - time.time()) * 1000.0 - DEADLINE_MARGIN_MS
+        if remaining_ms <= 0:
+            return None
+        # Every search stops at the deadline, so none can hold a worker past it
+        if time_limit_ms is None:
+            if name == "mcts" and node_limit is None:
+                node_limit = MCTS_DEFAULT_ITERATIONS  # Keep its fixed-iteration search, not one that fills the deadline
+            time_limit_ms = remaining_ms
+        time_limit_ms = max(1, int(min(time_limit_ms, remaining_ms)))
+    engine = _engine_for(name, shape, options_key)
+    result = engine.choose_move(board_state, "X", time_limit_ms=time_limit_ms, node_limit=node_limit)
+    store = getattr(engine, "position_store", None)
+    if store is not None:
+        store.flush()  # Workers exit without running atexit, so nothing may stay buffered
+    return result.move, result.stats.as_dict()
+
+
+# ---------------------------------------------------------
+# SESSIONS
+# ---------------------------------------------------------
+
+def check_positive(value, name, kinds=(int, float)):
+    """Raises RequestError (bad_request) unless `value` is a positive number of one of `kinds` (not a bool)."""
+    if not isinstance(value, kinds) or isinstance(value, bool) or value <= 0:
+        kind = "integer" if kinds == (int,) else "number"
+        raise RequestError("bad_request", f"{name} must be a positive {kind}")
+
+
+def check_board(request, max_cells):
+    """The BoardGeometry of a "new" request, refused with bad_request past `max_cells` cells."""
+    rows, cols, k = request.get("rows", 3), request.get("cols"), request.get("k")
+    check_positive(rows, "rows", (int,))
+    for name, value in (("cols", cols), ("k", k)):
+        if value is not None:
+            check_positive(value, name, (int,))
+    if rows * (rows if cols is None else cols) > max_cells:
+        raise RequestError("bad_request", f"Board is larger than this server's {max_cells} cells")
+    try:
+        return get_geometry(rows, cols, k)
+    except (TypeError, ValueError) as error:
+        raise RequestError("bad_request", str(error)) from None
+
+
+def check_options(engine, options, geometry):
+    """Raises RequestError (bad_request) unless every client option is allowed for `engine` and well typed."""
+    if not isinstance(options, dict):
+        raise RequestError("bad_request", "options must be an object")
+    allowed = CLIENT_OPTIONS.get(engine, {})
+    for name, value in options.items():
+        kind = allowed.get(name)
+        if kind is None:
+            raise RequestError("bad_request", f"Option {name!r} is not allowed for {engine}"
+                                              f" (allowed: {', '.join(sorted(allowed)) or 'none'})")
+        if value is None and name in ("depth_limit", "static_eval"):
+            continue  # Their defaults
+        # bool is a subclass of int, so it is checked for separately
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise RequestError("bad_request", f"Option {name!r} must be {kind.__name__}")
+    depth_limit = options.get("depth_limit")
+    if depth_limit is not None and not 1 <= depth_limit <= geometry.cells:
+        raise RequestError("bad_request", f"depth_limit must be from 1 to {geometry.cells}")
+    if options.get("rollout_policy", "random") not in ROLLOUT_POLICIES:
+        raise RequestError("bad_request", f"rollout_policy must be one of {', '.join(ROLLOUT_POLICIES)}")
+
+
+async def acquire_within(lock, timeout):
+    """
+    Acquires `lock` within `timeout` seconds, else raises asyncio.TimeoutError.
+    On a timeout or cancellation the lock is never left held.
+    """
+    if hasattr(asyncio, "timeout"):  # Python 3.11+
+        async with asyncio.timeout(timeout):
+            await lock.acquire()
+        return
+    acquire = asyncio.ensure_future(lock.acquire())
+    try:
+        await asyncio.wait_for(asyncio.shield(acquire), timeout)
+    except BaseException:
+        # wait_for can give up just as acquire() completes: release what it got
+        if acquire.done() and not acquire.cancelled() and acquire.exception() is None:
+            lock.release()
+        else:
+            acquire.cancel()
+        raise
+
+
+class GameSession:
+
+    def __init__(self, session_id, engine, geometry, options, time_limit_ms, node_limit):
+        self.session_id = session_id
+        self.engine = engine
+        self.geometry = geometry
+        self.shape = (geometry.rows, geometry.cols, geometry.k)
+        self.options_key = json.dumps(options, sort_keys=True)
+        self.time_limit_ms = time_limit_ms
+        self.node_limit = node_limit
+        self.board = BitBoard(geometry)
+        self.status = "playing"
+        self.lock = asyncio.Lock()  # One move at a time per game
+        self.last_used = time.monotonic()
+
+    def board_string(self):
+        return "".join("." if spot == " " else spot for spot in self.board.to_list())
+
+    def play(self, cell, player):
+        self.board.make_move(cell, player)
+        if self.board.is_winner_at(player, cell):
+            self.status = f"{player} wins"
+        elif self.board.is_full():
+            self.status = "draw"
+
+    def describe(self):
+        return {"session": self.session_id, "engine": self.engine, "board_size": self.geometry.label,
+                "board": self.board_string(), "status": self.status}
+
+
+class GameServer:
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, workers=None, max_sessions=10000,
+                 max_pending=None, deadline_ms=DEFAULT_DEADLINE_MS, session_idle_s=600, engine_options=None,
+                 max_cells=DEFAULT_MAX_CELLS):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_sessions = max_sessions
+        # Enough queued searches to keep every worker busy, not enough to build an unbounded backlog
+        self.max_pending = max_pending or self.workers * 4
+        self.deadline_ms = deadline_ms
+        self.session_idle_s = session_idle_s
+        self.max_cells = max_cells
+        # {engine: {option: value}} set by the server for every session (e.g. position_store)
+        self.engine_options = engine_options or {}
+        self.sessions = {}
+        self.pending = 0
+        self.counters = dict.fromkeys(("requests", "searches", "busy", "deadline_misses", "errors",
+                                       "server_errors", "pool_restarts"), 0)
+        self._ids = itertools.count(1)
+        self._pool = None
+        self._server = None
+        self._connections = set()
+
+    async def start(self):
+        """Starts listening (port 0 picks a free port; self.port is updated)."""
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if self._connections:
+            # Clients that already hung up finish on their own; the rest are cut off
+            await asyncio.wait(list(self._connections), timeout=1.0)
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    # ---------------------------------------------------------
+    # CONNECTIONS
+    # ---------------------------------------------------------
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handle_line(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()  # Waits while the client isn't reading
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            pass  # Client went away, sent a line past the stream limit, or the server is closing
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def handle_line(self, line):
+        self.counters["requests"] += 1
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RequestError("bad_request", "Request is not valid JSON") from None
+            if not isinstance(request, dict):
+                raise RequestError("bad_request", "Request must be a JSON object")
+            request_id = request.get("id")
+            response = await self.handle(request)
+            response["ok"] = True
+        except RequestError as error:
+            if error.code == "busy":
+                self.counters["busy"] += 1
+            elif error.code == "deadline":
+                self.counters["deadline_misses"] += 1
+            elif error.code == "server_error":
+                self.counters["server_errors"] += 1
+            else:
+                self.counters["errors"] += 1
+            response = {"ok": False, "code": error.code, "error": str(error)}
+        response["id"] = request_id
+        return response
+
+    async def handle(self, request):
+        op = request.get("op")
+        deadline_ms = request.get("deadline_ms", self.deadline_ms)
+        check_positive(deadline_ms, "deadline_ms")
+        deadline = time.monotonic() + deadline_ms / 1000.0
+        if op == "new":
+            return await self.new_session(request, deadline)
+        if op == "move":
+            return await self.move(request, deadline)
+        if op == "state":
+            return self._session(request).describe()
+        if op == "close":
+            session = self._session(request)
+            del self.sessions[session.session_id]
+            return {"session": session.session_id, "closed": True}
+        if op == "stats":
+            return self.stats()
+        if op == "ping":
+            return {}
+        raise RequestError("bad_request", f"Unknown op {op!r}")
+
+    def stats(self):
+        return dict(self.counters, sessions=len(self.sessions), pending=self.pending,
+                    max_pending=self.max_pending, workers=self.workers)
+
+    # ---------------------------------------------------------
+    # GAME OPERATIONS
+    # ---------------------------------------------------------
+
+    def _session(self, request):
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise RequestError("not_found", f"No session {request.get('session')!r}")
+        session.last_used = time.monotonic()
+        return session
+
+    def _expire_sessions(self):
+        cutoff = time.monotonic() - self.session_idle_s
+        for session_id in [sid for sid, s in self.sessions.items() if s.last_used < cutoff and not s.lock.locked()]:
+            del self.sessions[session_id]
+
+    async def new_session(self, request, deadline):
+        if len(self.sessions) >= self.max_sessions:
+            self._expire_sessions()
+            if len(self.sessions) >= self.max_sessions:
+                raise RequestError("busy", f"Session limit ({self.max_sessions}) reached")
+        engine = request.get("engine", "alphabeta")
+        options = request.get("options") or {}
+        try:
+            get_engine_spec(engine)
+        except (TypeError, ValueError) as error:
+            raise RequestError("bad_request", str(error)) from None
+        geometry = check_board(request, self.max_cells)
+        check_options(engine, options, geometry)
+        options = dict(self.engine_options.get(engine, {}), **options)
+        time_limit_ms, node_limit = request.get("time_limit_ms"), request.get("node_limit")
+        if time_limit_ms is not None:
+            check_positive(time_limit_ms, "time_limit_ms")
+        if node_limit is not None:
+            check_positive(node_limit, "node_limit", (int,))
+
+        session = GameSession(f"s{next(self._ids)}", engine, geometry, options, time_limit_ms, node_limit)
+        response = {}
+        if request.get("ai_first"):
+            async with session.lock:
+                response = await self._ai_reply(session, deadline)
+        self.sessions[session.session_id] = session
+        response.update(session.describe())
+        return response
+
+    async def move(self, request, deadline):
+        session = self._session(request)
+        cell = request.get("cell")
+        try:
+            await acquire_within(session.lock, self._remaining(deadline))
+        except asyncio.TimeoutError:
+            raise RequestError("deadline", "Deadline passed waiting for the session's previous move") from None
+        try:
+            if session.status != "playing":
+                raise RequestError("bad_request", f"Game is over ({session.status})")
+            if not isinstance(cell, int) or not 0 <= cell < session.geometry.cells \
+                    or not session.board.empty_mask() >> cell & 1:
+                raise RequestError("bad_request", f"Cell {cell!r} is not a legal move")
+            board, status = session.board.copy(), session.status
+            session.play(cell, "O")
+            response = {"human_move": cell}
+            if session.status == "playing":
+                try:
+                    response.update(await self._ai_reply(session, deadline))
+                except RequestError:
+                    session.board, session.status = board, status  # The move can be sent again
+                    raise
+        finally:
+            session.lock.release()
+        response.update(session.describe())
+        return response
+
+    @staticmethod
+    def _remaining(deadline):
+        return max(0.0, deadline - time.monotonic())
+
+    async def _ai_reply(self, session, deadline):
+        """Searches the AI's move for `session` within `deadline` and plays it."""
+        remaining = self._remaining(deadline)
+        if remaining <= 0:
+            raise RequestError("deadline", "Deadline passed before the search started")
+        args = (session.engine, session.shape, session.options_key, session.board.to_list(),
+                session.time_limit_ms, session.node_limit, time.time() + remaining)
+        start = time.perf_counter()
+        if session.engine in INLINE_ENGINES:
+            try:
+                result = search_move(*args)
+            except (TypeError, ValueError) as error:
+                raise RequestError("bad_request", f"Search failed: {error}") from None
+            except Exception as error:
+                raise RequestError("server_error", f"Search failed: {error!r}") from None
+        else:
+            result = await self._search_in_pool(args, remaining)
+        if result is None:
+            raise RequestError("deadline", "Deadline passed while the search was queued")
+        move, stats = result
+        self.counters["searches"] += 1
+        session.play(move, "X")
+        return {"ai_move": move, "search_ms": round((time.perf_counter() - start) * 1000.0, 3), "stats": stats}
+
+    async def _search_in_pool(self, args, timeout):
+        if self.pending >= self.max_pending:
+            raise RequestError("busy", f"{self.pending} searches already pending, retry later")
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            future = pool.submit(search_move, *args)
+        except BrokenProcessPool:
+            pool = self._restart_pool(pool)
+            future = pool.submit(search_move, *args)
+        # Counted until the worker is actually done, even if the request gives up on it first
+        self.pending += 1
+        future.add_done_callback(lambda _: self._search_done(loop))
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # Drops it if still queued; a running search finishes on its own budget
+            raise RequestError("deadline", "Deadline passed during the search") from None
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise RequestError("server_error", "A search worker died; the pool was restarted") from None
+        except (TypeError, ValueError) as error:
+            raise RequestError("bad_request", f"Search failed: {error}") from None
+        except Exception as error:
+            raise RequestError("server_error", f"Search failed: {error!r}") from None
+
+    def _restart_pool(self, broken):
+        """
+        Replaces the pool `broken` (a worker died, e.g. killed for memory,
+        which fails every later submit) unless that was already done.
+        Returns the current pool.
+        """
+        if self._pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self.counters["pool_restarts"] += 1
+        return self._pool
+
+    def _search_done(self, loop):
+        # Runs on the pool's thread: hand the update to the event loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._release_pending)
+
+    def _release_pending(self):
+        self.pending -= 1
+
+
+async def run_server(args):
+    engine_options = {}
+    if args.position_store is not None:
+        for engine in ("minimax", "alphabeta", "mcts"):
+            engine_options.setdefault(engine, {})["position_store"] = args.position_store
+    if args.solved_table is not None:
+        for engine in ("minimax", "alphabeta"):
+            engine_options.setdefault(engine, {})["solved_table_path"] = args.solved_table
+    server = await GameServer(args.host, args.port, args.workers, args.max_sessions, args.max_pending,
+                              args.deadline_ms, engine_options=engine_options, max_cells=args.max_cells).start()
+    print(f"Serving on {server.host}:{server.port} with {server.workers} search workers "
+          f"(max {server.max_pending} pending searches)", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON-lines TCP server for concurrent games against the engines.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Search processes (default: CPU count)")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Searches queued or running before requests get 'busy' (default: 4 per worker)")
+    parser.add_argument("--deadline-ms", type=int, default=DEFAULT_DEADLINE_MS,
+                        help="Default per-request deadline")
+    parser.add_argument("--max-cells", type=int, default=DEFAULT_MAX_CELLS,
+                        help="Largest board (rows * cols) a client may start a game on")
+    parser.add_argument("--position-store", default=None,
+                        help="sqlite position cache (position_store.py) for every minimax, alphabeta and mcts session")
+    parser.add_argument("--solved-table", default=None, help="Solved 3x3 table path for minimax and alphabeta")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_server(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Board geometry for m,n,k games: a rows x cols board where k in a row
+(horizontally, vertically or diagonally) wins. Classic Tic-Tac-Toe is 3,3,3.
+
+Everything that only depends on (rows, cols, k) is computed once here and
+shared: every winning segment, its bitmask, and for each cell the segments
+running through it. Win checks after a move then only need to look at the
+segments through that move's cell.
+"""
+
+_GEOMETRIES = {}
+
+
+class BoardGeometry:
+
+    def __init__(self, rows, cols, k):
+        if rows < 1 or cols < 1:
+            raise ValueError(f"Board must have at least one row and column, got {rows}x{cols}")
+        if not 1 <= k <= max(rows, cols):
+            raise ValueError(f"k={k} doesn't fit on a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full_mask = (1 << self.cells) - 1
+
+        # Every k-long segment: horizontal, vertical, diagonal, anti-diagonal
+        # (with k=1 every direction gives the same single cells, so keep one)
+        segments = []
+        directions = ((0, 1),) if k == 1 else ((0, 1), (1, 0), (1, 1), (1, -1))
+        for dr, dc in directions:
+            for row in range(rows):
+                for col in range(cols):
+                    end_row = row + dr * (k - 1)
+                    end_col = col + dc * (k - 1)
+                    if 0 <= end_row < rows and 0 <= end_col < cols:
+                        segments.append(tuple((row + dr * i) * cols + (col + dc * i) for i in range(k)))
+        self.segments = tuple(segments)
+        self.segment_masks = tuple(sum(1 << cell for cell in segment) for segment in segments)
+
+        cell_segments = [[] for _ in range(self.cells)]
+        for index, segment in enumerate(segments):
+            for cell in segment:
+                cell_segments[cell].append(index)
+        self.cell_segments = tuple(tuple(indices) for indices in cell_segments)
+        self.cell_masks = tuple(
+            tuple(self.segment_masks[index] for index in indices) for indices in self.cell_segments
+        )
+        # Strategic cells: the middle cell(s) and the four corners
+        self.center_cells = frozenset(r * cols + c for r in ((rows - 1) // 2, rows // 2)
+                                      for c in ((cols - 1) // 2, cols // 2))
+        self.corner_cells = frozenset((0, cols - 1, (rows - 1) * cols, rows * cols - 1))
+        self._symmetries = None
+
+    @property
+    def is_square(self):
+        return self.rows == self.cols
+
+    @property
+    def label(self):
+        if self.k == self.rows == self.cols:
+            return f"{self.rows}x{self.cols}"
+        return f"{self.rows}x{self.cols}, {self.k} in a row"
+
+    @property
+    def symmetries(self):
+        """
+        Cell permutations (perm[cell] is where the cell lands) that map the
+        board onto itself: 8 for square boards (4 rotations, each optionally
+        mirrored), 4 for rectangular ones (identity, both flips, half turn).
+        """
+        if self._symmetries is None:
+            rows, cols = self.rows, self.cols
+            perms = []
+            if self.is_square:
+                for flip in (False, True):
+                    for turns in range(4):
+                        perm = []
+                        for cell in range(self.cells):
+                            row, col = divmod(cell, cols)
+                            if flip:
+                                col = cols - 1 - col
+                            for _ in range(turns):
+                                row, col = col, rows - 1 - row
+                            perm.append(row * cols + col)
+                        perms.append(tuple(perm))
+            else:
+                for flip_rows in (False, True):
+                    for flip_cols in (False, True):
+                        perm = []
+                        for cell in range(self.cells):
+                            row, col = divmod(cell, cols)
+                            if flip_rows:
+                                row = rows - 1 - row
+                            if flip_cols:
+                                col = cols - 1 - col
+                            perm.append(row * cols + col)
+                        perms.append(tuple(perm))
+            self._symmetries = tuple(perms)
+        return self._symmetries
+
+    def __reduce__(self):
+        # Unpickle through the cache (worker processes get the shared instance)
+        return (get_geometry, (self.rows, self.cols, self.k))
+
+    def __repr__(self):
+        return f"BoardGeometry(rows={self.rows}, cols={self.cols}, k={self.k})"
+
+
+def get_geometry(rows=3, cols=None, k=None):
+    """
+    Returns the shared BoardGeometry for (rows, cols, k). cols defaults to
+    rows (square board) and k to the shorter side (classic rules when square).
+    Passing a BoardGeometry returns it unchanged.
+    """
+    if isinstance(rows, BoardGeometry):
+        return rows
+    if cols is None:
+        cols = rows
+    if k is None:
+        k = min(rows, cols)
+    key = (rows, cols, k)
+    geometry = _GEOMETRIES.get(key)
+    if geometry is None:
+        geometry = BoardGeometry(rows, cols, k)
+        _GEOMETRIES[key] = geometry
+    return geometry
@@ -1,39 +1,54 @@
 import random
 import sys
 
+from bitboard import BitBoard, list_is_winner, print_list_board
+from engines import MoveResult, engine_board
+from geometry import get_geometry
+from search_stats import SearchStats, instrumented
+
+# Move scores, highest priority first
+WIN_SCORE = 100
+BLOCK_SCORE = 50
+CENTER_SCORE = 5
+CORNER_SCORE = 3
+EDGE_SCORE = 1
+POSITION_NAMES = {CENTER_SCORE: "CENTER", CORNER_SCORE: "CORNER", EDGE_SCORE: "EDGE"}
+
+
+def positional_scores(geometry):
+    """Score of each cell for a move that neither wins nor blocks: center, corner or edge."""
+    return tuple(
+        CENTER_SCORE if cell in geometry.center_cells else CORNER_SCORE if cell in geometry.corner_cells
+        else EDGE_SCORE
+        for cell in range(geometry.cells)
+    )
+
 
 class HeuristicTicTacToe:
 
-    def __init__(self):
-        # A list of 9 items representing the 3x3 board
-        self.board = [" " for _ in range(9)]
+    def __init__(self, geometry=None):
+        # geometry: rows x cols board, k in a row wins (classic 3x3 by default)
+        self.geometry = get_geometry(3) if geometry is None else get_geometry(geometry)
+        # A list of rows * cols items, " "/"X"/"O" (9 items for the 3x3 board)
+        self.board = [" " for _ in range(self.geometry.cells)]
         self.human = "O"
         self.ai = "X"
         self.nodes_evaluated = 0
+        self.best_score = None  # Heuristic score of the last move chosen
+        self.stats = SearchStats()  # Statistics of the last get_heuristic_move call
+        self.profile_hook = None  # See search_stats.py
+        # Strategic value of every cell: the middle cell(s), then the four corners
+        self.positional_scores = positional_scores(self.geometry)
 
     def reset_board(self):
-        self.board = [" " for _ in range(9)]
+        self.board = [" " for _ in range(self.geometry.cells)]
 
     def print_board(self):
-        print("\n")
-        print(f" {self.board[0]} | {self.board[1]} | {self.board[2]} ")
-        print("---+---+---")
-        print(f" {self.board[3]} | {self.board[4]} | {self.board[5]} ")
-        print("---+---+---")
-        print(f" {self.board[6]} | {self.board[7]} | {self.board[8]} ")
-        print("\n")
+        print_list_board(self.board, self.geometry)
 
     def is_winner(self, player, board_state):
-        # All winning combinations (rows, cols, diagonals)
-        win_conditions = [
-            (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Rows
-            (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Cols
-            (0, 4, 8), (2, 4, 6)              # Diagonals
-        ]
-        for a, b, c in win_conditions:
-            if board_state[a] == board_state[b] == board_state[c] == player:
-                return True
-        return False
+        # Winning segments are precomputed once per geometry (geometry.py)
+        return list_is_winner(player, board_state, self.geometry)
 
     def is_full(self):
         return " " not in self.board
@@ -41,17 +56,30 @@ class HeuristicTicTacToe:
     def get_available_moves(self):
         return [i for i, spot in enumerate(self.board) if spot == " "]
 
+    def choose_move(self, board, player=None, time_limit_ms=None, node_limit=None):
+        """
+        Engine protocol (engines.py): the move for `player` on `board` and the
+        stats of its search.
+        Budgets are ignored: the heuristic doesn't search.
+        """
+        self.board = engine_board(board, player, self.geometry, self.ai)
+        move = self.get_heuristic_move(verbose=False)
+        return MoveResult(move, self.stats, self.best_score)
+
+    @instrumented
     def get_heuristic_move(self, verbose=True):
         """
         Phase 1 Logic: Score every empty spot and pick the highest score.
-        Returns best_move.
+        Returns best_move. nodes_evaluated counts the spots scored for this move.
         """
+        self.nodes_evaluated = 0
         best_score = -1
         best_move = None
         scores = {}
 
-        # Get all empty spots indices
-        available_moves = self.get_available_moves()
+        # Search on the bitboard copy of the current position
+        board = BitBoard.from_list(self.board, self.geometry)
+        available_moves = board.get_available_moves()
         if verbose:
             print("AI Thinking (Heuristic Scores):")
 
@@ -59,32 +87,26 @@ class HeuristicTicTacToe:
             self.nodes_evaluated += 1
             score = 0
 
-            # Create a temporary copy of the board to test the move
-            temp_board = self.board[:]
-
             # 1. CHECK FOR WIN (Highest Priority)
-            temp_board[move] = self.ai
-            if self.is_winner(self.ai, temp_board):
-                score = 100
+            board.make_move(move, self.ai)
+            wins = board.is_winner_at(self.ai, move)
+            board.unmake_move(move, self.ai)
+            if wins:
+                score = WIN_SCORE
                 reason = "WIN"
             else:
                 # 2. CHECK FOR BLOCK (High Priority)
                 # See if opponent would win if they took this spot
-                temp_board[move] = self.human
-                if self.is_winner(self.human, temp_board):
-                    score = 50
+                board.make_move(move, self.human)
+                blocks = board.is_winner_at(self.human, move)
+                board.unmake_move(move, self.human)
+                if blocks:
+                    score = BLOCK_SCORE
                     reason = "BLOCK"
                 else:
-                    # 3. STRATEGIC POSITIONING
-                    if move == 4:  # Center
-                        score = 5
-                        reason = "CENTER"
-                    elif move in [0, 2, 6, 8]:  # Corners
-                        score = 3
-                        reason = "CORNER"
-                    else:  # Edges
-                        score = 1
-                        reason = "EDGE"
+                    # 3. STRATEGIC POSITIONING (center, then corners, then edges)
+                    score = self.positional_scores[move]
+                    reason = POSITION_NAMES[score]
             
             scores[move] = (score, reason)
 
@@ -96,6 +118,8 @@ class HeuristicTicTacToe:
                 best_score = score
                 best_move = move
 
+        self.stats.nodes = self.nodes_evaluated
+        self.best_score = best_score
         if verbose:
             print(f"AI chooses spot {best_move} with score {best_score}")
             
@@ -105,18 +129,19 @@ class HeuristicTicTacToe:
         self.reset_board()
         print("--- Heuristic Tic Tac Toe ---")
         print("You are 'O'. AI is 'X'.")
-        print("Positions are 0-8 (0 is top-left, 8 is bottom-right).")
+        last = self.geometry.cells - 1
+        print(f"Positions are 0-{last} (0 is top-left, {last} is bottom-right).")
 
         while True:
             self.print_board()
             # Human Turn
             try:
-                move = int(input("Enter your move (0-8): "))
+                move = int(input(f"Enter your move (0-{self.geometry.cells - 1}): "))
                 if self.board[move] != " ":
                     print("Invalid move! Spot taken.")
                     continue
             except (ValueError, IndexError):
-                print("Invalid input! Please enter a number 0-8.")
+                print(f"Invalid input! Please enter a number 0-{self.geometry.cells - 1}.")
                 continue
 
             self.board[move] = self.human
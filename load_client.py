@@ -0,0 +1,207 @@
+"""
+Load generator for game_server.py.
+
+Opens `connections` concurrent connections. Each one plays `games` games
+against the server, making random legal moves as O and alternating who
+starts. Requests refused as "busy" are retried after a short back-off, and
+a move that misses its deadline is sent again. The summary (JSON) covers
+the request counts by outcome, throughput, round-trip latency percentiles
+and the game results.
+
+Against a running server:
+    python3 load_client.py --port 8765 --connections 64 --games 5 --engine mcts --node-limit 500
+
+Or fully self-contained: start a server in this process on a free port:
+    python3 load_client.py --serve --workers 4 --connections 32 --engine alphabeta
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from benchmark import percentile
+from game_server import DEFAULT_PORT, GameServer
+
+BACKOFF_S = (0.005, 0.2)  # First and longest wait before resending a busy / late request
+MAX_ATTEMPTS = 20  # Per request, before the game is abandoned
+
+
+class GameClient:
+    """One JSON-lines connection to the server; requests are sent one at a time."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = 0
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=DEFAULT_PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, **params):
+        self._ids += 1
+        params.update(op=op, id=self._ids)
+        self.writer.write(json.dumps(params).encode() + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        return json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class LoadStats:
+
+    def __init__(self):
+        self.latencies = []
+        self.outcomes = {}  # "ok" or the error code -> count
+        self.results = {"ai_wins": 0, "client_wins": 0, "draws": 0, "abandoned": 0}
+
+    def record(self, response, elapsed):
+        self.latencies.append(elapsed)
+        outcome = "ok" if response.get("ok") else response.get("code", "error")
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+async def _send(client, stats, op, **params):
+    """
+    Sends one request, again (with exponential back-off) while it is refused
+    as busy or late. Returns the last response.
+    """
+    backoff, longest = BACKOFF_S
+    for _ in range(MAX_ATTEMPTS):
+        start = time.perf_counter()
+        response = await client.request(op, **params)
+        stats.record(response, time.perf_counter() - start)
+        if response.get("ok") or response.get("code") not in ("busy", "deadline"):
+            break
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, longest)
+    return response
+
+
+def _check_retryable(response):
+    # Busy and late requests are expected under load; anything else is a bug in the client or server
+    if response.get("code") not in ("busy", "deadline"):
+        raise RuntimeError(f"Request failed: {response.get('error')}")
+
+
+async def play_games(host, port, games, game_settings, stats, rng, first_game=1, deadline_ms=None):
+    limits = {} if deadline_ms is None else {"deadline_ms": deadline_ms}
+    client = await GameClient.connect(host, port)
+    try:
+        for game_num in range(first_game, first_game + games):
+            response = await _send(client, stats, "new", ai_first=game_num % 2 == 1, **game_settings, **limits)
+            if not response.get("ok"):
+                _check_retryable(response)
+                stats.results["abandoned"] += 1
+                continue
+            session = response["session"]
+            while response["status"] == "playing":
+                cell = rng.choice([i for i, spot in enumerate(response["board"]) if spot == "."])
+                response = await _send(client, stats, "move", session=session, cell=cell, **limits)
+                if not response.get("ok"):
+                    _check_retryable(response)
+                    break
+            status = response.get("status")
+            if status == "draw":
+                stats.results["draws"] += 1
+            elif status in ("X wins", "O wins"):
+                stats.results["ai_wins" if status == "X wins" else "client_wins"] += 1
+            else:
+                stats.results["abandoned"] += 1  # Still busy / late after every attempt
+            await client.request("close", session=session)
+    finally:
+        await client.close()
+
+
+async def run_load(host, port, connections, games, game_settings, seed=0, deadline_ms=None):
+    stats = LoadStats()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        play_games(host, port, games, game_settings, stats, random.Random(seed * 1000003 + index),
+                   first_game=index + 1, deadline_ms=deadline_ms)
+        for index in range(connections)
+    ))
+    wall_time = time.perf_counter() - start
+
+    client = await GameClient.connect(host, port)
+    try:
+        server_stats = await client.request("stats")
+    finally:
+        await client.close()
+
+    latencies = sorted(stats.latencies)
+    requests = len(latencies)
+    return {
+        "connections": connections,
+        "games": connections * games,
+        "requests": requests,
+        "outcomes": stats.outcomes,
+        "results": stats.results,
+        "requests_per_sec": round(requests / wall_time, 1) if wall_time else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000.0, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000.0, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000.0, 3),
+            "max": round(latencies[-1] * 1000.0, 3) if latencies else 0.0,
+        },
+        "wall_time_s": round(wall_time, 3),
+        "server": server_stats,
+        "settings": dict(game_settings, deadline_ms=deadline_ms),
+    }
+
+
+async def _main(args):
+    game_settings = {"engine": args.engine, "rows": args.rows, "cols": args.cols, "k": args.k,
+                     "time_limit_ms": args.time_limit_ms, "node_limit": args.node_limit}
+    server = None
+    if args.serve:
+        server = await GameServer(args.host, 0, args.workers, max_pending=args.max_pending).start()
+    port = server.port if server else args.port
+    try:
+        return await run_load(args.host, port, args.connections, args.games, game_settings, args.seed,
+                              args.deadline_ms)
+    finally:
+        if server is not None:
+            await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load generator for game_server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--serve", action="store_true", help="Start a server in this process on a free port")
+    parser.add_argument("--workers", type=int, default=None, help="Search processes for --serve")
+    parser.add_argument("--max-pending", type=int, default=None, help="Backpressure limit for --serve")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--games", type=int, default=5, help="Games per connection")
+    parser.add_argument("--engine", default="alphabeta")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=None)
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--time-limit-ms", type=int, default=None)
+    parser.add_argument("--node-limit", type=int, default=None)
+    parser.add_argument("--deadline-ms", type=int, default=None, help="Per-request deadline (default: the server's)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    text = json.dumps(asyncio.run(_main(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Transposition-aware MCTS store: a DAG with one node per position.
+
+A tree (MCTSNode, MCTSTreePool) has one node per move sequence, so a
+position reached by different move orders is searched, and its statistics
+split, once per order. Here positions are looked up by their Zobrist hash
+(BitBoard.zobrist_hash, updated with one XOR per move) in a position table,
+so every order leads to the same DagNode, and an expansion that reaches a
+position already in the table adds only an edge. A node keeps:
+
+    visits, wins      every simulation through the position, by any path
+    children, moves   its edges: children[i] is the position after moves[i]
+    edge_visits       simulations that took each edge from this node
+
+Selection is UCB1 over the edges, with the child position's shared win
+rate and the edge's own visit count in the exploration term, so a line into
+a well-known position is still explored from each of its parents.
+Backpropagation follows the path the simulation took (a node can have
+several parents, so there is no parent pointer) and updates each node and
+edge on it once.
+
+Within one search, positions with the same pieces are the same number of
+moves below the root, so the pieces fix the side to move and the hash
+leaves it out. Hashes are 64 bits and not checked: two of n positions
+collide with probability about n^2 / 2^65.
+"""
+
+import math
+
+from bitboard import get_zobrist_keys
+
+
+class DagNode:
+    # Edges (class defaults until the first one is added, as most nodes are leaves):
+    # the child position, the move to it, and the edge's visits and 1 / sqrt(visits)
+    children = moves = edge_visits = edge_inv_sqrt_visits = ()
+
+    def __init__(self, board, player):
+        # board is a BitBoard; only its empty cells are kept on the node, and its
+        # Zobrist hash is carried along by the search instead of stored
+        self.player = player  # The player who just moved to create this state
+        self.wins = 0
+        self.visits = 0
+        self.untried_moves = board.get_available_moves()
+
+    def best_edge(self, c_param=1.41):
+        # UCB1 per edge: the child position's win rate + c * sqrt(2 ln N / n), n the edge's visits
+        exploration = c_param * math.sqrt(2 * math.log(self.visits))
+        best, best_weight, index = 0, -math.inf, 0
+        for child, inv_sqrt_visits in zip(self.children, self.edge_inv_sqrt_visits):
+            weight = child.wins / child.visits + exploration * inv_sqrt_visits
+            if weight > best_weight:
+                best, best_weight = index, weight
+            index += 1
+        return best
+
+
+class MCTSGraph:
+
+    def __init__(self, root_board, player):
+        # The root is the position after `player`'s move (the AI is to move)
+        self.x_keys, self.o_keys = get_zobrist_keys(root_board.geometry)
+        self.root = DagNode(root_board, player)
+        self.root_key = root_board.zobrist_hash()
+        self.table = {self.root_key: self.root}  # Zobrist hash -> DagNode
+        self.transpositions = 0  # Edges added into a position already in the table
+
+    def __len__(self):
+        return len(self.table)
+
+    def add_edge(self, node, move, player, board, key):
+        """
+        Adds the edge for `player` playing `move` from `node` (`board` is the
+        position after it, `key` its Zobrist hash) and returns the child: the
+        position's node if the table has it, else a new one.
+        """
+        child = self.table.get(key)
+        if child is None:
+            child = DagNode(board, player)
+            self.table[key] = child
+        else:
+            self.transpositions += 1
+        if not node.children:
+            node.children, node.moves, node.edge_visits, node.edge_inv_sqrt_visits = [], [], [], []
+        node.children.append(child)
+        node.moves.append(move)
+        node.edge_visits.append(0)
+        node.edge_inv_sqrt_visits.append(0.0)  # Set by the backpropagation of the same simulation
+        return child
+
+    def backpropagate(self, path, leaf, playouts, x_wins, o_wins):
+        """Adds a simulation's result to `leaf` and to every (node, edge index) of `path`."""
+        sqrt = math.sqrt
+        leaf.visits += playouts
+        leaf.wins += x_wins if leaf.player == "X" else o_wins
+        for node, index in path:
+            node.visits += playouts
+            node.wins += x_wins if node.player == "X" else o_wins
+            visits = node.edge_visits[index] + playouts
+            node.edge_visits[index] = visits
+            node.edge_inv_sqrt_visits[index] = 1.0 / sqrt(visits)
+
+    def child_stats(self):
+        """{move: (visits, wins)} for the root's moves, from the positions they lead to."""
+        return {move: (child.visits, child.wins) for move, child in zip(self.root.moves, self.root.children)}
+
+    def reroot(self, board, player):
+        """
+        Makes `board` (where `player` just moved) the root if it is in the
+        graph, and drops the positions it can't reach. Returns False if it
+        isn't there.
+        """
+        root_key = board.zobrist_hash()
+        node = self.table.get(root_key)
+        if node is None or node.player != player:
+            return False
+        if node is not self.root:
+            table = {root_key: node}
+            stack = [(node, root_key)]
+            while stack:
+                node, key = stack.pop()
+                for move, child in zip(node.moves, node.children):
+                    child_key = key ^ (self.x_keys if child.player == "X" else self.o_keys)[move]
+                    if child_key not in table:
+                        table[child_key] = child
+                        stack.append((child, child_key))
+            self.root = table[root_key]
+            self.root_key = root_key
+            self.table = table
+        return True
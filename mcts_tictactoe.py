@@ -1,68 +1,242 @@
+from array import array
 import random
 import math
 import sys
+import time
+
+from batch_moves import iter_best_moves
+from bitboard import BitBoard, list_is_winner
+from engines import MoveResult, engine_board
+from geometry import get_geometry
+from mcts_dag import MCTSGraph
+from mcts_tree_pool import MCTSTreePool, NO_NODE, PLAYERS, PLAYER_CODES, ROOT
+from position_store import open_store
+from rollout_policy import get_rollout_policy
+from search_budget import SearchBudget
+from search_stats import MCTS_PHASES, SearchStats, instrumented
+from win_tracker import WinTracker
+
+# RAVE: the parent visit count at which a child's own win rate and its AMAF
+# win rate are weighted equally (the AMAF weight fades from 1 towards 0)
+RAVE_EQUIVALENCE = 3000
+
+# MCTS-Solver: game values proven for node.player (the player who moved into the node)
+PROVEN_LOSS, PROVEN_DRAW, PROVEN_WIN = -1, 0, 1
 
 class MCTSNode:
+    # MCTS-Solver: the proven value, and the proven children, which are moved
+    # out of `children` so selection skips them (class defaults until set)
+    proven = None
+    proven_children = ()
+
     def __init__(self, board, parent=None, move=None, player="X"):
-        self.board = board
+        # board is a BitBoard; only its empty cells are kept on the node
         self.parent = parent
         self.move = move
         self.player = player  # The player who just moved to create this state
         self.children = []
+        # Selection arrays, parallel to `children`: each child's win rate and
+        # 1 / sqrt(visits). Built on the first selection (nodes are only selected
+        # from once fully expanded), then refreshed by every backpropagation
+        self.child_win_rates = None
+        self.child_inv_sqrt_visits = None
+        self.index = 0  # Position in the parent's children and selection arrays
         self.wins = 0
         self.visits = 0
+        # All-moves-as-first (RAVE): simulations through the parent in which
+        # self.player took self.move at any later point, and the wins among them
+        self.amaf_wins = 0
+        self.amaf_visits = 0
         self.untried_moves = self.get_available_moves(board)
 
     def get_available_moves(self, board):
-        return [i for i, spot in enumerate(board) if spot == " "]
+        return board.get_available_moves()
 
     def is_fully_expanded(self):
         return len(self.untried_moves) == 0
 
+    def add_child(self, child):
+        child.index = len(self.children)
+        self.children.append(child)
+
+    def _build_selection_arrays(self):
+        children = self.children
+        self.child_win_rates = array("d", [child.wins / child.visits for child in children])
+        self.child_inv_sqrt_visits = array("d", [1.0 / math.sqrt(child.visits) for child in children])
+
+    def prove(self, value):
+        """
+        Marks this node proven, then proves its ancestors where that settles
+        them: a node is lost if a child is won (for the opponent, who moves
+        there), and once every child is proven, won if they are all lost
+        and drawn otherwise.
+        """
+        node = self
+        node.proven = value
+        while node.parent is not None:
+            parent = node.parent
+            index = node.index
+            del parent.children[index]
+            if parent.child_win_rates is not None:
+                del parent.child_win_rates[index]
+                del parent.child_inv_sqrt_visits[index]
+            for child in parent.children[index:]:
+                child.index -= 1
+            if not parent.proven_children:
+                parent.proven_children = []
+            parent.proven_children.append(node)
+            if node.proven == PROVEN_WIN:
+                parent.proven = PROVEN_LOSS
+            elif parent.children or parent.untried_moves:
+                return
+            elif any(child.proven == PROVEN_DRAW for child in parent.proven_children):
+                parent.proven = PROVEN_DRAW
+            else:
+                parent.proven = PROVEN_WIN
+            node = parent
+
     def best_child(self, c_param=1.41):
-        # Upper Confidence Bound 1 (UCB1) algorithm
-        choices_weights = [
-            (child.wins / child.visits) + c_param * math.sqrt((2 * math.log(self.visits) / child.visits))
-            for child in self.children
-        ]
-        return self.children[choices_weights.index(max(choices_weights))]
+        # Upper Confidence Bound 1 (UCB1): win rate + c * sqrt(2 ln N / n), from the
+        # cached child arrays, so the parent's log term is computed once per call
+        if self.child_win_rates is None:
+            self._build_selection_arrays()
+        exploration = c_param * math.sqrt(2 * math.log(self.visits))
+        best, best_weight, index = 0, -math.inf, 0
+        for win_rate, inv_sqrt_visits in zip(self.child_win_rates, self.child_inv_sqrt_visits):
+            weight = win_rate + exploration * inv_sqrt_visits
+            if weight > best_weight:
+                best, best_weight = index, weight
+            index += 1
+        return self.children[best]
+
+    def best_child_rave(self, rave_equivalence, c_param=1.41):
+        # UCB1 on a blend of each child's win rate and its AMAF win rate. The AMAF
+        # weight is sqrt(k / (3n + k)) for this node's n visits (k = rave_equivalence)
+        if self.child_win_rates is None:
+            self._build_selection_arrays()
+        beta = math.sqrt(rave_equivalence / (3 * self.visits + rave_equivalence))
+        exploration = c_param * math.sqrt(2 * math.log(self.visits))
+        best, best_weight = None, -math.inf
+        for child, win_rate, inv_sqrt_visits in zip(self.children, self.child_win_rates, self.child_inv_sqrt_visits):
+            weight = ((1 - beta) * win_rate + beta * child.amaf_wins / child.amaf_visits
+                      + exploration * inv_sqrt_visits)
+            if weight > best_weight:
+                best, best_weight = child, weight
+        return best
+
+def _mcts_worker(geometry, board_state, iterations, seed, time_limit_ms=None, rollout_batch=1, compact_tree=False,
+                 rave=False, rave_equivalence=RAVE_EQUIVALENCE, rollout_policy="random", solver=False,
+                 transpositions=False):
+    """
+    Root-parallel worker: grows an independent tree from board_state with
+    its own RNG seed. Returns ({move: (visits, wins)} for the root children,
+    iterations run, the worker's SearchStats, {move: proven value} for the
+    root children the solver proved, whether the clock stopped it before
+    its iteration share).
+    """
+    random.seed(seed)
+    engine = MCTSTicTacToe(geometry=geometry, reuse_tree=False, rollout_batch=rollout_batch, compact_tree=compact_tree,
+                           rave=rave, rave_equivalence=rave_equivalence, rollout_policy=rollout_policy,
+                           solver=solver, transpositions=transpositions)
+    engine.board = board_state
+    budget = SearchBudget(time_limit_ms) if time_limit_ms is not None else None
+    root = engine.run_search(iterations, budget)
+    stopped_early = budget is not None and budget.stopped_early
+    return engine.root_child_stats(root), engine.iterations_run, engine.stats, engine.root_proofs(root), stopped_early
+
+def _add_stats(stats, extra):
+    """{move: (visits, wins)} of `stats` with `extra`'s visits and wins for the same moves added (extra may be None)."""
+    if not extra:
+        return stats
+    return {move: (visits + extra.get(move, (0, 0))[0], wins + extra.get(move, (0, 0))[1])
+            for move, (visits, wins) in stats.items()}
 
 class MCTSTicTacToe:
-    def __init__(self, size=3):
-        self.size = size
-        self.board = [" " for _ in range(size * size)]
+    def __init__(self, size=3, geometry=None, workers=1, reuse_tree=True, rollout_batch=1, compact_tree=False,
+                 position_store=None, rave=False, rave_equivalence=RAVE_EQUIVALENCE, rollout_policy="random",
+                 solver=False, transpositions=False):
+        # geometry (rows x cols, k in a row) overrides size, which means a size x size full-row board
+        self.geometry = get_geometry(size) if geometry is None else get_geometry(geometry)
+        self.size = self.geometry.rows
+        self.board = [" " for _ in range(self.geometry.cells)]
         self.human = "O"
         self.ai = "X"
-        self.nodes_evaluated = 0 # Actually "Iterations" in MCTS context
+        self.iterations_run = 0  # MCTS iterations of the last search
+        self.best_score = None  # Win rate of the last move chosen
+        self.budget_used = {}
+        # Worker processes for root-parallel search (1 = search in this process)
+        self.workers = workers
+        self._pool = None
+        self._pool_workers = 0
+        # Tree kept between moves (subtree reuse); reused_visits is how much
+        # of the last search's root came from the previous turn
+        self.reuse_tree = reuse_tree
+        self._tree_root = None
+        self._tree_board = None
+        self.reused_visits = 0
+        # Random games played per leaf; > 1 uses the NumPy batch backend (batch_rollout.py)
+        self.rollout_batch = rollout_batch
+        self._batch_rollouts = None
+        self._np_rng = None
+        # Statistics of the last get_mcts_move call, and an optional profiler (search_stats.py)
+        self.stats = SearchStats()
+        self.profile_hook = None
+        # Keep the tree in a typed-array node pool (mcts_tree_pool.py) instead of MCTSNode objects
+        self.compact_tree = compact_tree
+        # Persistent visit/win statistics shared across runs (position_store.py), or None
+        self.position_store = open_store(position_store)
+        # RAVE / all-moves-as-first: selection also uses the win rate of each move
+        # played anywhere later in a simulation (MCTSNode.best_child_rave)
+        if rave and compact_tree:
+            raise ValueError("rave needs the MCTSNode tree (compact_tree=False)")
+        if rave and rollout_batch > 1:
+            raise ValueError("rave needs the moves of each rollout (rollout_batch=1)")
+        self.rave = rave
+        self.rave_equivalence = rave_equivalence
+        # How single rollouts pick their moves: "random", "decisive" (the strongest), "heuristic"
+        # or a policy object (rollout_policy.py)
+        self.rollout_policy = get_rollout_policy(rollout_policy, self.geometry)
+        if rollout_batch > 1 and self.rollout_policy.name != "random":
+            raise ValueError("Batched rollouts (rollout_batch > 1) only play random moves")
+        # MCTS-Solver: terminal nodes are proven wins / draws, proofs are passed up
+        # the tree (MCTSNode.prove) and proven subtrees are no longer searched
+        if solver and compact_tree:
+            raise ValueError("solver needs the MCTSNode tree (compact_tree=False)")
+        self.solver = solver
+        # Transpositions: one node per position, found by Zobrist hash, so move orders
+        # that reach the same position share its statistics (mcts_dag.py)
+        if transpositions and (compact_tree or rave or solver):
+            raise ValueError("transpositions keep their own node store, without compact_tree, rave or solver")
+        self.transpositions = transpositions
+
+    @property
+    def nodes_evaluated(self):
+        """Old name of iterations_run (MCTS counts iterations, not nodes; stats.nodes has the nodes)."""
+        return self.iterations_run
+
+    @nodes_evaluated.setter
+    def nodes_evaluated(self, value):
+        self.iterations_run = value
 
     def reset_board(self):
-        self.board = [" " for _ in range(self.size * self.size)]
+        self.board = [" " for _ in range(self.geometry.cells)]
+        self._tree_root = None
+        self._tree_board = None
 
     def print_board(self):
         print("\n")
-        for row in range(self.size):
-            start = row * self.size
-            line = " | ".join(self.board[start:start + self.size])
+        cols = self.geometry.cols
+        for row in range(self.geometry.rows):
+            start = row * cols
+            line = " | ".join(self.board[start:start + cols])
             print(f" {line} ")
-            if row < self.size - 1:
-                print("-" * (self.size * 4 - 1))
+            if row < self.geometry.rows - 1:
+                print("-" * (cols * 4 - 1))
         print("\n")
 
     def is_winner(self, player, board):
-        # Check Rows
-        for row in range(self.size):
-            if all(board[row * self.size + col] == player for col in range(self.size)):
-                return True
-        # Check Cols
-        for col in range(self.size):
-            if all(board[row * self.size + col] == player for row in range(self.size)):
-                return True
-        # Check Diagonals
-        if all(board[i * self.size + i] == player for i in range(self.size)):
-            return True
-        if all(board[i * self.size + (self.size - 1 - i)] == player for i in range(self.size)):
-            return True
-        return False
+        # Winning segments are precomputed once per geometry (geometry.py)
+        return list_is_winner(player, board, self.geometry)
 
     def is_full(self, board):
         return " " not in board
@@ -74,83 +248,606 @@ class MCTSTicTacToe:
     # PHASE 4 LOGIC: MONTE CARLO TREE SEARCH (Scalable AI)
     # ---------------------------------------------------------
     
-    def get_mcts_move(self, iterations=1000, verbose=True):
+    def choose_move(self, board, player=None, time_limit_ms=None, node_limit=None):
+        """
+        Engine protocol (engines.py): the move for `player` on `board` and the
+        stats of its search.
+        node_limit caps the iterations (1000 when there is no budget).
+        """
+        self.board = engine_board(board, player, self.geometry, self.ai)
+        move = self.get_mcts_move(verbose=False, time_limit_ms=time_limit_ms, node_limit=node_limit)
+        return MoveResult(move, self.stats, self.best_score)
+
+    def best_moves(self, positions, player=None, time_limit_ms=None, node_limit=None):
+        """
+        Batch API (batch_moves.py): a generator of BatchResult(index, move,
+        score, cached) for each position, symmetric duplicates searched once.
+        """
+        return iter_best_moves(self, positions, player, time_limit_ms, node_limit)
+
+    @instrumented
+    def get_mcts_move(self, iterations=1000, verbose=True, workers=None, iterations_per_worker=None, seed=None,
+                      time_limit_ms=None, node_limit=None):
         """
         Runs MCTS to find the best move.
         Does NOT search the whole tree. Simulates random games.
+
+        time_limit_ms / node_limit replace the fixed iteration count: the
+        search iterates until the deadline (capped at node_limit iterations
+        if given). self.budget_used reports what was actually spent.
+
+        With workers > 1 (defaults to self.workers) the search is root-parallel:
+        each worker process grows its own tree from the current position with
+        its own seed (seed + worker index), running iterations_per_worker
+        iterations (default: iterations split evenly), and the root children's
+        visits and wins are summed before picking the move.
         """
-        self.nodes_evaluated = 0
+        self.iterations_run = 0
+        self.best_score = None
+        budget = SearchBudget(time_limit_ms, node_limit)
+        if budget.limited:
+            iterations = node_limit  # None: iterate until the deadline
+        workers = self.workers if workers is None else workers
+        if workers <= 1:
+            max_iterations = iterations
+        else:
+            if iterations_per_worker is None and iterations is not None:
+                iterations_per_worker = max(1, -(-iterations // workers))
+            max_iterations = None if iterations_per_worker is None else workers * iterations_per_worker
+        stored = {}
+        if self.position_store is not None:
+            stored = self.position_store.get_child_stats(BitBoard.from_list(self.board, self.geometry))
+            best_move = self._stored_move(stored, max_iterations, budget, verbose)
+            if best_move is not None:
+                return best_move
+        if workers > 1:
+            return self._get_parallel_mcts_move(iterations, verbose, workers, iterations_per_worker, seed, budget,
+                                                stored)
+
+        root = self.run_search(iterations, budget)
+        self.budget_used = budget.report(self.iterations_run, reused_visits=self.reused_visits)
+        if self.solver:
+            self.budget_used["solved"] = root.proven is not None
+        stats = self.root_child_stats(root)
+
+        if not stats:
+            return random.choice(self.get_available_moves(self.board))
+            
+        # Select the child with the most visits (most robust move), stored visits included
+        best_move = self._select_move(_add_stats(stats, stored), self.root_proofs(root))
+        if self.position_store is not None:
+            self.position_store.add_child_stats(BitBoard.from_list(self.board, self.geometry), stats)
+        
+        if verbose:
+            print(f"AI chooses spot {best_move} (Simulations: {self.iterations_run}, reused from last move: {self.reused_visits})")
+            
+        return best_move
+
+    def _stored_move(self, stats, max_iterations, budget, verbose):
+        """
+        The most visited move from the position store's statistics when its
+        lead over the runner-up (the best move to a position that isn't a
+        symmetric copy of its own) is more than `max_iterations`, the most
+        this search can run, so it couldn't overturn the lead even if every
+        iteration went to the runner-up; else None. A search bounded only by
+        the clock (max_iterations None) always runs. A close call is searched
+        again and picked on the stored and new statistics together, so an
+        early estimate is never frozen. `stats` is the store's
+        {move: (visits, wins)}.
+        """
+        if not stats or max_iterations is None:
+            return None
+        board = BitBoard.from_list(self.board, self.geometry)
+        child_keys = {}
+        for move in stats:
+            board.make_move(move, self.ai)
+            child_keys[move] = board.canonical_key()
+            board.unmake_move(move, self.ai)
+        best_move = max(stats, key=lambda move: stats[move][0])
+        runner_up = max((stats[move][0] for move in stats if child_keys[move] != child_keys[best_move]), default=0)
+        if stats[best_move][0] - runner_up <= max_iterations:
+            return None
+        visits = sum(child_visits for child_visits, _ in stats.values())
+        self.best_score = stats[best_move][1] / stats[best_move][0]
+        self.budget_used = budget.report(0, source="position_store", stored_visits=round(visits))
+        if verbose:
+            print(f"AI chooses spot {best_move} from the position cache ({visits} stored simulations)")
+        return best_move
+
+    def root_child_stats(self, root):
+        """{move: (visits, wins)} for the children of a root returned by run_search()."""
+        if self.compact_tree:
+            return root.child_stats(ROOT)
+        if self.transpositions:
+            return root.child_stats()
+        return {child.move: (child.visits, child.wins)
+                for children in (root.children, root.proven_children) for child in children}
+
+    def root_proofs(self, root):
+        """{move: PROVEN_WIN / PROVEN_DRAW / PROVEN_LOSS for the AI} for the root children the solver proved."""
+        if self.compact_tree or self.transpositions:
+            return {}
+        return {child.move: child.proven for child in root.proven_children}
+
+    def _select_move(self, stats, proofs):
+        """
+        The most visited move of `stats` ({move: (visits, wins)}), and its win
+        rate as self.best_score. A move proven to win is taken outright (score
+        1.0), and moves proven to lose are only picked when every move loses.
+        """
+        winning = [move for move, value in proofs.items() if value == PROVEN_WIN]
+        if winning:
+            self.best_score = 1.0
+            return max(winning, key=lambda move: stats[move][0])
+        candidates = [move for move in stats if proofs.get(move) != PROVEN_LOSS] or list(stats)
+        best_move = max(candidates, key=lambda move: stats[move][0])
+        self.best_score = stats[best_move][1] / stats[best_move][0]
+        return best_move
+
+    def run_search(self, iterations, budget=None):
+        """
+        Runs MCTS iterations from self.board and returns the root node
+        (the MCTSTreePool, rooted at index 0, with compact_tree; the
+        MCTSGraph with transpositions).
+        Stops after `iterations` (None: no cap) or when `budget` runs out.
+        """
+        self.iterations_run = 0
+        if self.rollout_batch > 1 and self._batch_rollouts is None:
+            self._load_batch_backend()
         # Root node represents the opponent's last move (current state)
         # So we say the "player" who made the move to get here was 'O' (Human)
-        root = MCTSNode(board=self.board[:], player=self.human) 
+        root_board = BitBoard.from_list(self.board, self.geometry)
+        # Per-line piece counts, so every win check below only looks at the lines through the last move
+        root_tracker = WinTracker.from_bitboard(root_board)
+        if self.compact_tree:
+            return self._run_compact_search(root_board, root_tracker, iterations, budget)
+        if self.transpositions:
+            return self._run_dag_search(root_board, root_tracker, iterations, budget)
+        root = self._find_subtree(root_board) if self.reuse_tree else None
+        if root is None:
+            root = MCTSNode(board=root_board, player=self.human) 
+        self.reused_visits = root.visits
+        clock = time.perf_counter
+        phase_times = [0.0] * len(MCTS_PHASES)
+        max_depth = 0
+        nodes_added = 0
+        rave, rave_equivalence = self.rave, self.rave_equivalence
+        solver = self.solver
+        played = proven_leaf = None
+        sqrt = math.sqrt
 
-        for _ in range(iterations):
-            self.nodes_evaluated += 1
+        while iterations is None or self.iterations_run < iterations:
+            if budget is not None and budget.expired(self.iterations_run):
+                break
+            if solver and root.proven is not None:
+                break  # Solved: every move's value is known
+            self.iterations_run += 1
             node = root
-            temp_board = self.board[:]
+            temp_board = root_board.copy()
+            tracker = root_tracker.copy()
+            depth = 0
+            start = clock()
 
             # 1. Selection
             # Go down the tree to a leaf node or unexpanded node
             while node.is_fully_expanded() and node.children:
-                node = node.best_child()
-                temp_board[node.move] = node.player
+                node = node.best_child_rave(rave_equivalence) if rave else node.best_child()
+                temp_board.make_move(node.move, node.player)
+                tracker.make_move(node.move, node.player)
+                depth += 1
+            selected = clock()
 
             # 2. Expansion
             # If we reached a node that isn't terminal and has untried moves, add a child
-            if not node.is_fully_expanded() and not self.is_winner("X", temp_board) and not self.is_winner("O", temp_board):
+            if not node.is_fully_expanded() and not tracker.is_over():
                 move = random.choice(node.untried_moves)
                 node.untried_moves.remove(move)
                 
                 player_moving = "X" if node.player == "O" else "O"
-                temp_board[move] = player_moving
+                temp_board.make_move(move, player_moving)
+                tracker.make_move(move, player_moving)
                 
                 new_node = MCTSNode(temp_board, parent=node, move=move, player=player_moving)
-                node.children.append(new_node)
+                node.add_child(new_node)
                 node = new_node
+                depth += 1
+                nodes_added += 1
+                if solver and tracker.is_over():
+                    # Proven after backpropagation, which still needs the node's index in its parent
+                    proven_leaf, proven_value = node, PROVEN_WIN if tracker.winner() else PROVEN_DRAW
+            expanded = clock()
 
             # 3. Simulation (Rollout)
-            # Play random moves until game over
-            current_player = node.player
-            while not self.is_winner("X", temp_board) and not self.is_winner("O", temp_board) and " " in temp_board:
-                current_player = "X" if current_player == "O" else "O"
-                possible_moves = [i for i, x in enumerate(temp_board) if x == " "]
-                if not possible_moves: break
-                move = random.choice(possible_moves)
-                temp_board[move] = current_player
+            playouts = self.rollout_batch
+            if rave:
+                played = []
+            x_wins, o_wins = self._rollout(temp_board, tracker, node.player, played)
+            rolled_out = clock()
 
             # 4. Backpropagation
             # Propagate the result back up the tree
-            winner = None
-            if self.is_winner("X", temp_board): winner = "X"
-            elif self.is_winner("O", temp_board): winner = "O"
-            
-            while node is not None:
-                node.visits += 1
-                if winner == self.ai: # AI (X) won
-                    # If the node's player is X, that move led to a win for X. Good!
-                    if node.player == self.ai: 
-                        node.wins += 1
-                    # If node's player is O, that means O's move allowed X to win later. Bad for O? 
-                    # (Simplified logic: usually we invert score for opponent nodes)
-                    # For simplicity here: +1 win for the player who just moved if they won.
-                elif winner == self.human: # Human (O) won
-                    if node.player == self.human:
-                        node.wins += 1 
-                node = node.parent
-
-        if not root.children:
+            # +1 win for the player who just moved (node.player) for every playout they won
+            if rave:
+                self._backpropagate_rave(node, played, x_wins, o_wins)
+            else:
+                while node is not None:
+                    node.visits += playouts
+                    node.wins += x_wins if node.player == "X" else o_wins
+                    parent = node.parent
+                    if parent is not None and parent.child_win_rates is not None:
+                        parent.child_win_rates[node.index] = node.wins / node.visits
+                        parent.child_inv_sqrt_visits[node.index] = 1.0 / sqrt(node.visits)
+                    node = parent
+            if proven_leaf is not None:
+                proven_leaf.prove(proven_value)
+                proven_leaf = None
+
+            phase_times[0] += selected - start
+            phase_times[1] += expanded - selected
+            phase_times[2] += rolled_out - expanded
+            phase_times[3] += clock() - rolled_out
+            if depth > max_depth:
+                max_depth = depth
+
+        self._record_search(phase_times, max_depth, nodes_added)
+        if self.reuse_tree:
+            self._tree_root = root
+            self._tree_board = root_board
+        return root
+
+    def _run_compact_search(self, root_board, root_tracker, iterations, budget):
+        """run_search() on an MCTSTreePool; same four phases, nodes are pool indices."""
+        pool = self._find_compact_subtree(root_board) if self.reuse_tree else None
+        if pool is None:
+            pool = MCTSTreePool(self.geometry.cells)
+            pool.add_node(NO_NODE, NO_NODE, PLAYER_CODES[self.human], root_board.empty_mask())
+        self.reused_visits = pool.visits[ROOT]
+        untried, first_child, moves, players = pool.untried, pool.first_child, pool.move, pool.player
+        clock = time.perf_counter
+        phase_times = [0.0] * len(MCTS_PHASES)
+        max_depth = 0
+        nodes_added = len(pool)
+
+        while iterations is None or self.iterations_run < iterations:
+            if budget is not None and budget.expired(self.iterations_run):
+                break
+            self.iterations_run += 1
+            node = ROOT
+            temp_board = root_board.copy()
+            tracker = root_tracker.copy()
+            depth = 0
+            start = clock()
+
+            # 1. Selection
+            while not untried[node] and first_child[node] != NO_NODE:
+                node = pool.best_child(node)
+                player = PLAYERS[players[node]]
+                temp_board.make_move(moves[node], player)
+                tracker.make_move(moves[node], player)
+                depth += 1
+            selected = clock()
+
+            # 2. Expansion
+            if untried[node] and not tracker.is_over():
+                move = pool.pop_untried(node)
+                player_code = 1 - players[node]
+                temp_board.make_move(move, PLAYERS[player_code])
+                tracker.make_move(move, PLAYERS[player_code])
+                node = pool.add_node(node, move, player_code, temp_board.empty_mask())
+                depth += 1
+            expanded = clock()
+
+            # 3. Simulation (Rollout)
+            x_wins, o_wins = self._rollout(temp_board, tracker, PLAYERS[players[node]])
+            rolled_out = clock()
+
+            # 4. Backpropagation
+            pool.backpropagate(node, self.rollout_batch, x_wins, o_wins)
+
+            phase_times[0] += selected - start
+            phase_times[1] += expanded - selected
+            phase_times[2] += rolled_out - expanded
+            phase_times[3] += clock() - rolled_out
+            if depth > max_depth:
+                max_depth = depth
+
+        self._record_search(phase_times, max_depth, len(pool) - nodes_added)
+        if self.reuse_tree:
+            self._tree_root = pool
+            self._tree_board = root_board
+        return pool
+
+    def _run_dag_search(self, root_board, root_tracker, iterations, budget):
+        """run_search() on an MCTSGraph; same four phases, transposed positions share one node."""
+        graph = self._find_dag_subtree(root_board) if self.reuse_tree else None
+        if graph is None:
+            graph = MCTSGraph(root_board, self.human)
+        root, root_key = graph.root, graph.root_key
+        self.reused_visits = root.visits
+        x_keys, o_keys = graph.x_keys, graph.o_keys
+        clock = time.perf_counter
+        phase_times = [0.0] * len(MCTS_PHASES)
+        max_depth = 0
+        nodes_added = len(graph)
+        transpositions = graph.transpositions
+
+        while iterations is None or self.iterations_run < iterations:
+            if budget is not None and budget.expired(self.iterations_run):
+                break
+            self.iterations_run += 1
+            node = root
+            key = root_key  # Zobrist hash of temp_board, updated with every move
+            temp_board = root_board.copy()
+            tracker = root_tracker.copy()
+            path = []  # (node, edge index) per move taken, for backpropagation
+            depth = 0
+            start = clock()
+
+            # 1. Selection
+            while not node.untried_moves and node.children:
+                index = node.best_edge()
+                path.append((node, index))
+                move = node.moves[index]
+                node = node.children[index]
+                temp_board.make_move(move, node.player)
+                tracker.make_move(move, node.player)
+                key ^= (x_keys if node.player == "X" else o_keys)[move]
+                depth += 1
+            selected = clock()
+
+            # 2. Expansion
+            # The edge leads to the position's node if another move order already
+            # added it (the simulation then runs from it again), else to a new node
+            if node.untried_moves and not tracker.is_over():
+                move = random.choice(node.untried_moves)
+                node.untried_moves.remove(move)
+                player_moving = "X" if node.player == "O" else "O"
+                temp_board.make_move(move, player_moving)
+                tracker.make_move(move, player_moving)
+                key ^= (x_keys if player_moving == "X" else o_keys)[move]
+                path.append((node, len(node.children)))
+                node = graph.add_edge(node, move, player_moving, temp_board, key)
+                depth += 1
+            expanded = clock()
+
+            # 3. Simulation (Rollout)
+            x_wins, o_wins = self._rollout(temp_board, tracker, node.player)
+            rolled_out = clock()
+
+            # 4. Backpropagation, along the path taken
+            graph.backpropagate(path, node, self.rollout_batch, x_wins, o_wins)
+
+            phase_times[0] += selected - start
+            phase_times[1] += expanded - selected
+            phase_times[2] += rolled_out - expanded
+            phase_times[3] += clock() - rolled_out
+            if depth > max_depth:
+                max_depth = depth
+
+        self._record_search(phase_times, max_depth, len(graph) - nodes_added)
+        # Expansions that reached a known position are the table's hits, new nodes its misses
+        self.stats.cache_hits += graph.transpositions - transpositions
+        self.stats.cache_misses += len(graph) - nodes_added
+        if self.reuse_tree:
+            self._tree_root = graph
+            self._tree_board = root_board
+        return graph
+
+    def _record_search(self, phase_times, max_depth, nodes_added):
+        stats = self.stats
+        for phase, seconds in zip(MCTS_PHASES, phase_times):
+            stats.phase_time[phase] += seconds
+        stats.max_depth = max(stats.max_depth, max_depth)
+        stats.nodes += nodes_added
+        stats.iterations += self.iterations_run
+
+    def _rollout(self, board, tracker, last_player, played=None):
+        """
+        Plays self.rollout_batch games from a leaf where `last_player` just
+        moved, with self.rollout_policy (batches are random). Returns
+        (x_wins, o_wins); the rest are draws. The moves of a single game are
+        appended to `played` if given.
+        """
+        playouts = self.rollout_batch
+        stats = self.stats
+        stats.rollouts += playouts
+        winner = tracker.winner()
+        if winner is not None or tracker.is_draw():
+            # Terminal leaf: every playout would end the same way, with no moves played
+            stats.measured_rollouts += playouts
+            return (playouts if winner == "X" else 0), (playouts if winner == "O" else 0)
+        if playouts > 1:
+            next_player = "X" if last_player == "O" else "O"
+            x_wins, o_wins, _, plies = self._batch_rollouts(board, next_player, playouts, self._np_rng)
+            stats.rollout_plies += plies
+            stats.measured_rollouts += playouts
+            return x_wins, o_wins
+
+        plies = self.rollout_policy.play(board, tracker, last_player, played)
+        stats.rollout_plies += plies
+        stats.measured_rollouts += 1
+        winner = tracker.winner()
+        return (1 if winner == "X" else 0), (1 if winner == "O" else 0)
+
+    def _backpropagate_rave(self, node, rollout_moves, x_wins, o_wins):
+        """
+        Backpropagation with AMAF updates: at every node on the way up, each
+        child whose move its player made later in this simulation (in the
+        tree below or in the rollout) gets an AMAF visit and the result.
+        """
+        # Cells each player took after the current node: the rollout first, then the tree moves below it
+        x_played = o_played = 0
+        mover = node.player
+        for move in rollout_moves:
+            mover = "X" if mover == "O" else "O"
+            if mover == "X":
+                x_played |= 1 << move
+            else:
+                o_played |= 1 << move
+        while node is not None:
+            node.visits += 1
+            node.wins += x_wins if node.player == "X" else o_wins
+            if node.parent is not None and node.parent.child_win_rates is not None:
+                node.parent.child_win_rates[node.index] = node.wins / node.visits
+                node.parent.child_inv_sqrt_visits[node.index] = 1.0 / math.sqrt(node.visits)
+            for child in node.children:
+                if child.player == "X":
+                    if x_played >> child.move & 1:
+                        child.amaf_visits += 1
+                        child.amaf_wins += x_wins
+                elif o_played >> child.move & 1:
+                    child.amaf_visits += 1
+                    child.amaf_wins += o_wins
+            if node.parent is not None:
+                if node.player == "X":
+                    x_played |= 1 << node.move
+                else:
+                    o_played |= 1 << node.move
+            node = node.parent
+
+    def _load_batch_backend(self):
+        # NumPy is only needed for batch rollouts, so it's imported on first use
+        try:
+            from batch_rollout import batch_rollouts, make_rng
+        except ImportError as e:
+            raise ImportError("rollout_batch > 1 needs NumPy (pip install numpy)") from e
+        self._batch_rollouts = batch_rollouts
+        # Seeded from `random` so random.seed() still makes searches reproducible
+        self._np_rng = make_rng(random.getrandbits(64))
+
+    def _find_subtree(self, board):
+        """
+        Re-roots the tree kept from the last search at `board` by following
+        the pieces placed since then (normally the AI's move and the reply).
+        Returns None if that position isn't in the tree.
+        """
+        node, old_board = self._tree_root, self._tree_board
+        if not isinstance(node, MCTSNode) or old_board.geometry is not board.geometry:
+            return None
+        # Pieces can only have been added
+        if old_board.x_bits & ~board.x_bits or old_board.o_bits & ~board.o_bits:
+            return None
+        new_x = board.x_bits & ~old_board.x_bits
+        new_o = board.o_bits & ~old_board.o_bits
+
+        while new_x or new_o:
+            mover = "X" if node.player == "O" else "O"
+            new_bits = new_x if mover == "X" else new_o
+            for child in node.children + list(node.proven_children):
+                if new_bits >> child.move & 1:
+                    break
+            else:
+                return None
+            node = child
+            if mover == "X":
+                new_x &= ~(1 << node.move)
+            else:
+                new_o &= ~(1 << node.move)
+
+        # The root always has the AI to move (the human "just moved")
+        if node.player != self.human:
+            return None
+        node.parent = None
+        return node
+
+    def _find_compact_subtree(self, board):
+        """_find_subtree() for a pool: follows the new pieces, then copies that subtree into a fresh pool."""
+        pool, old_board = self._tree_root, self._tree_board
+        if not isinstance(pool, MCTSTreePool) or old_board.geometry is not board.geometry:
+            return None
+        if old_board.x_bits & ~board.x_bits or old_board.o_bits & ~board.o_bits:
+            return None
+        new_bits = [board.x_bits & ~old_board.x_bits, board.o_bits & ~old_board.o_bits]
+
+        node = ROOT
+        while new_bits[0] or new_bits[1]:
+            mover = 1 - pool.player[node]
+            for child in pool.children(node):
+                if new_bits[mover] >> pool.move[child] & 1:
+                    break
+            else:
+                return None
+            node = child
+            new_bits[mover] &= ~(1 << pool.move[node])
+
+        if PLAYERS[pool.player[node]] != self.human:
+            return None
+        return pool if node == ROOT else pool.subtree(node)
+
+    def _find_dag_subtree(self, board):
+        """_find_subtree() for a graph: looks the new position up by its hash and drops what it can't reach."""
+        graph, old_board = self._tree_root, self._tree_board
+        if not isinstance(graph, MCTSGraph) or old_board.geometry is not board.geometry:
+            return None
+        if old_board.x_bits & ~board.x_bits or old_board.o_bits & ~board.o_bits:
+            return None
+        return graph if graph.reroot(board, self.human) else None
+
+    # ---------------------------------------------------------
+    # ROOT-PARALLEL SEARCH
+    # ---------------------------------------------------------
+
+    def _get_pool(self, workers):
+        # The pool is kept between moves so worker start-up is paid once
+        if self._pool is None or self._pool_workers != workers:
+            from concurrent.futures import ProcessPoolExecutor  # Only parallel searches pay for the import
+            self.close()
+            self._pool = ProcessPoolExecutor(max_workers=workers)
+            self._pool_workers = workers
+        return self._pool
+
+    def _get_parallel_mcts_move(self, iterations, verbose, workers, iterations_per_worker, seed, budget, stored=None):
+        # iterations_per_worker comes from get_mcts_move (None: iterate until the deadline)
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        pool = self._get_pool(workers)
+        futures = [
+            pool.submit(_mcts_worker, self.geometry, self.board[:], iterations_per_worker, seed + i,
+                        budget.time_limit_ms, self.rollout_batch, self.compact_tree, self.rave, self.rave_equivalence,
+                        self.rollout_policy, self.solver, self.transpositions)
+            for i in range(workers)
+        ]
+
+        # Merge the root children statistics of every tree
+        visits = {}
+        wins = {}
+        proofs = {}
+        for future in futures:
+            stats, worker_iterations, worker_stats, worker_proofs, stopped_early = future.result()
+            budget.stopped_early |= stopped_early  # Truncated if any worker was
+            self.iterations_run += worker_iterations
+            self.stats.merge(worker_stats)
+            proofs.update(worker_proofs)  # A proof holds in every tree
+            for move, (child_visits, child_wins) in stats.items():
+                visits[move] = visits.get(move, 0) + child_visits
+                wins[move] = wins.get(move, 0) + child_wins
+        self.budget_used = budget.report(self.iterations_run, workers=workers)
+
+        if not visits:
             return random.choice(self.get_available_moves(self.board))
-            
-        # Select the child with the most visits (most robust move)
-        best_child = max(root.children, key=lambda c: c.visits)
-        
+
+        best_move = self._select_move(_add_stats({move: (visits[move], wins[move]) for move in visits}, stored),
+                                      proofs)
+        if self.position_store is not None:
+            self.position_store.add_child_stats(BitBoard.from_list(self.board, self.geometry),
+                                                {move: (visits[move], wins[move]) for move in visits})
+
         if verbose:
-            print(f"AI chooses spot {best_child.move} (Simulations: {iterations})")
-            
-        return best_child.move
+            print(f"AI chooses spot {best_move} (Simulations: {self.iterations_run} across {workers} workers, "
+                  f"win rate {wins[best_move] / visits[best_move]:.2f})")
+
+        return best_move
+
+    def close(self):
+        """Shuts down the worker pool used by parallel search, if any."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_workers = 0
 
-    def play(self):
-        print(f"--- MCTS Tic Tac Toe ({self.size}x{self.size}) ---")
+    def play(self, iterations=None, time_limit_ms=None):
+        print(f"--- MCTS Tic Tac Toe ({self.geometry.label}) ---")
         print("You are 'O'. AI is 'X'.")
         
         while True:
@@ -158,12 +855,12 @@ class MCTSTicTacToe:
             
             # Human Turn
             try:
-                move = int(input(f"Enter move (0-{self.size*self.size-1}): "))
+                move = int(input(f"Enter move (0-{self.geometry.cells-1}): "))
                 if self.board[move] != " ":
                     print("Invalid move! Spot taken.")
                     continue
             except (ValueError, IndexError):
-                print(f"Invalid input! Please enter a number 0-{self.size*self.size-1}.")
+                print(f"Invalid input! Please enter a number 0-{self.geometry.cells-1}.")
                 continue
 
             self.board[move] = self.human
@@ -180,8 +877,8 @@ class MCTSTicTacToe:
             # AI Turn
             print("AI Thinking (MCTS Simulation)...")
             # Increase iterations for larger boards to maintain intelligence
-            iters = 1000 if self.size == 3 else 5000 
-            ai_move = self.get_mcts_move(iterations=iters)
+            iters = iterations or (1000 if self.geometry.cells <= 9 else 5000)
+            ai_move = self.get_mcts_move(iterations=iters, time_limit_ms=time_limit_ms)
             self.board[ai_move] = self.ai
             
             if self.is_winner(self.ai, self.board):
@@ -193,14 +890,15 @@ class MCTSTicTacToe:
                 print("It's a Draw!")
                 break
 
-    def simulate(self, max_games=10):
-        print(f"\n--- Starting Simulation: MCTS AI ({self.size}x{self.size}) vs Random Player ({max_games} games) ---")
+    def simulate(self, max_games=10, iterations=None, time_limit_ms=None):
+        print(f"\n--- Starting Simulation: MCTS AI ({self.geometry.label}) vs Random Player ({max_games} games) ---")
         ai_wins = 0
         random_wins = 0
         draws = 0
         total_iterations = 0
+        total_ai_moves = 0
 
-        iters = 1000 if self.size == 3 else 3000
+        iters = iterations or (1000 if self.geometry.cells <= 9 else 3000)
 
         for game_num in range(1, max_games + 1):
             self.reset_board()
@@ -212,8 +910,9 @@ class MCTSTicTacToe:
             while True:
                 if ai_turn:
                     # AI Turn
-                    move = self.get_mcts_move(iterations=iters, verbose=False)
-                    total_iterations += iters
+                    move = self.get_mcts_move(iterations=iters, verbose=False, time_limit_ms=time_limit_ms)
+                    total_iterations += self.iterations_run
+                    total_ai_moves += 1
                     self.board[move] = self.ai
                     
                     if self.is_winner(self.ai, self.board):
@@ -242,13 +941,16 @@ class MCTSTicTacToe:
                     ai_turn = True
         
         print("\n" + "=" * 50)
-        print(f"📊 SIMULATION RESULTS (MCTS - {self.size}x{self.size})")
+        print(f"📊 SIMULATION RESULTS (MCTS - {self.geometry.label})")
         print("=" * 50)
         print(f"Total Games:      {max_games}")
         print(f"AI Wins:          {ai_wins} ({(ai_wins/max_games)*100:.1f}%)")
         print(f"Random Wins:      {random_wins} ({(random_wins/max_games)*100:.1f}%)")
         print(f"Draws:            {draws} ({(draws/max_games)*100:.1f}%)")
-        print(f"Iterations/Move:  {iters} (Fixed)")
+        if time_limit_ms is None:
+            print(f"Iterations/Move:  {iters} (Fixed)")
+        else:
+            print(f"Iterations/Move:  {total_iterations // max(1, total_ai_moves)} (avg, {time_limit_ms} ms per move)")
         print("=" * 50)
 
 if __name__ == "__main__":
@@ -261,7 +963,8 @@ if __name__ == "__main__":
         print("3. Play 5x5 (Super)")
         print("4. Run Simulation (3x3)")
         print("5. Run Simulation (4x4)")
-        print("6. Exit")
+        print("6. Play custom board (rows, cols, k in a row)")
+        print("7. Exit")
         
         choice = input("Enter choice: ")
         
@@ -289,5 +992,15 @@ if __name__ == "__main__":
             except ValueError:
                 pass
         elif choice == "6":
+            try:
+                rows = int(input("Rows: "))
+                cols = int(input("Cols: "))
+                k = int(input("In a row to win: "))
+                game = MCTSTicTacToe(geometry=get_geometry(rows, cols, k))
+            except ValueError as e:
+                print(f"Invalid board: {e}")
+                continue
+            game.play()
+        elif choice == "7":
             sys.exit()
 
@@ -0,0 +1,161 @@
+"""
+Compact MCTS tree store (struct-of-arrays node pool).
+
+Instead of one MCTSNode object per node (each with its own __dict__,
+children list and untried-moves list), node i's fields live at index i of
+a handful of typed arrays:
+
+    move, parent, first_child, next_sibling   int32
+    player                                    int8  (0 = X, 1 = O)
+    visits, wins                              int64
+    untried                                   uint64 bitmask of untried cells
+
+Children are a linked list (first_child -> next_sibling -> ...). The
+arrays are preallocated and grow one chunk at a time, so a node costs
+about 41 bytes and the garbage collector never sees the tree.
+"""
+
+from array import array
+import math
+import random
+
+from bitboard import popcount
+
+NO_NODE = -1
+ROOT = 0
+
+PLAYERS = ("X", "O")
+PLAYER_CODES = {"X": 0, "O": 1}
+
+
+class MCTSTreePool:
+
+    def __init__(self, cells, chunk_size=4096):
+        self.cells = cells
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.capacity = 0
+        self.move = array("i")
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.player = array("b")
+        self.visits = array("q")
+        self.wins = array("q")
+        # Masks wider than 64 cells don't fit a machine word; those boards keep a list of ints
+        self.untried = array("Q") if cells <= 64 else []
+        self._grow()
+
+    def _arrays(self):
+        return (self.move, self.parent, self.first_child, self.next_sibling,
+                self.player, self.visits, self.wins)
+
+    def _grow(self):
+        chunk = self.chunk_size
+        for values in self._arrays():
+            values.frombytes(bytes(chunk * values.itemsize))
+        if isinstance(self.untried, array):
+            self.untried.frombytes(bytes(chunk * self.untried.itemsize))
+        else:
+            self.untried.extend([0] * chunk)
+        self.capacity += chunk
+
+    def __len__(self):
+        return self.size
+
+    def nbytes(self):
+        """Bytes allocated for node storage (capacity, not just nodes in use)."""
+        total = sum(values.itemsize * len(values) for values in self._arrays())
+        if isinstance(self.untried, array):
+            total += self.untried.itemsize * len(self.untried)
+        return total
+
+    # ---------------------------------------------------------
+    # NODES
+    # ---------------------------------------------------------
+
+    def add_node(self, parent, move, player, untried):
+        """
+        Appends a node and links it under `parent` (NO_NODE for the root).
+        `player` is the code of the player who moved into it, `untried` the
+        bitmask of its empty cells. Returns the new node's index.
+        """
+        if self.size == self.capacity:
+            self._grow()
+        node = self.size
+        self.size += 1
+        self.move[node] = move
+        self.parent[node] = parent
+        self.first_child[node] = NO_NODE
+        self.player[node] = player
+        self.visits[node] = 0
+        self.wins[node] = 0
+        self.untried[node] = untried
+        if parent == NO_NODE:
+            self.next_sibling[node] = NO_NODE
+        else:
+            self.next_sibling[node] = self.first_child[parent]
+            self.first_child[parent] = node
+        return node
+
+    def pop_untried(self, node):
+        """Removes and returns a uniformly random untried move of `node`."""
+        mask = self.untried[node]
+        for _ in range(random.randrange(popcount(mask))):
+            mask &= mask - 1
+        bit = mask & -mask
+        self.untried[node] ^= bit
+        return bit.bit_length() - 1
+
+    def children(self, node):
+        child = self.first_child[node]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    def find_child(self, node, move):
+        for child in self.children(node):
+            if self.move[child] == move:
+                return child
+        return NO_NODE
+
+    def best_child(self, node, c_param=1.41):
+        # Upper Confidence Bound 1 (UCB1), same formula as MCTSNode.best_child
+        visits, wins, next_sibling = self.visits, self.wins, self.next_sibling
+        log_visits = 2 * math.log(visits[node])
+        best, best_weight = NO_NODE, -math.inf
+        child = self.first_child[node]
+        while child != NO_NODE:
+            child_visits = visits[child]
+            weight = wins[child] / child_visits + c_param * math.sqrt(log_visits / child_visits)
+            if weight > best_weight:
+                best, best_weight = child, weight
+            child = next_sibling[child]
+        return best
+
+    def backpropagate(self, node, playouts, x_wins, o_wins):
+        """Adds `playouts` visits from `node` up to the root, crediting each node's mover with its wins."""
+        visits, wins, player, parent = self.visits, self.wins, self.player, self.parent
+        while node != NO_NODE:
+            visits[node] += playouts
+            wins[node] += o_wins if player[node] else x_wins
+            node = parent[node]
+
+    def child_stats(self, node=ROOT):
+        """{move: (visits, wins)} for the children of `node`."""
+        return {self.move[child]: (self.visits[child], self.wins[child]) for child in self.children(node)}
+
+    def subtree(self, node):
+        """
+        Copies the subtree under `node` into a new pool with `node` as its
+        root (index 0). Nodes outside it are dropped with the old pool.
+        """
+        pool = MCTSTreePool(self.cells, self.chunk_size)
+        stack = [(node, NO_NODE)]
+        while stack:
+            old, new_parent = stack.pop()
+            new = pool.add_node(new_parent, self.move[old], self.player[old], self.untried[old])
+            pool.visits[new] = self.visits[old]
+            pool.wins[new] = self.wins[old]
+            stack.extend((child, new) for child in self.children(old))
+        return pool
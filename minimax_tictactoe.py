@@ -1,39 +1,62 @@
 import random
 import sys
 
+from batch_moves import iter_best_moves
+from bitboard import BitBoard, list_is_winner, print_list_board
+from engines import MoveResult, engine_board
+from geometry import get_geometry
+from position_store import open_store
+from search_budget import SearchBudget, SearchTimeout
+from search_stats import SearchStats, instrumented
+from solved_table import SolvedTable
+from transposition import TranspositionTable, from_node_score, to_node_score
+
 
 class MinimaxTicTacToe:
 
-    def __init__(self):
-        # A list of 9 items representing the 3x3 board
-        self.board = [" " for _ in range(9)]
+    def __init__(self, geometry=None, use_transposition=True, tt_max_size=65536,
+                 use_solved_table=True, solved_table_path=None, position_store=None):
+        # geometry: rows x cols board, k in a row wins (classic 3x3 by default)
+        self.geometry = get_geometry(3) if geometry is None else get_geometry(geometry)
+        # A list of rows * cols items, " "/"X"/"O" (9 items for the 3x3 board)
+        self.board = [" " for _ in range(self.geometry.cells)]
         self.human = "O"
         self.ai = "X"
+        # Score of a win found right away; 10 on 3x3, and large enough that
+        # win_score - depth stays positive on bigger boards
+        self.win_score = self.geometry.cells + 1
         self.nodes_evaluated = 0
+        self.best_score = None  # Score of the last move chosen (AI's point of view)
+        # Transposition table survives between moves; counters are per move
+        self.tt = TranspositionTable(tt_max_size) if use_transposition else None
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.tt_stores = 0
+        # Budget bookkeeping: set for the duration of a budgeted search
+        self._budget = None
+        self._depth_limit = None
+        self._hit_horizon = False
+        self.budget_used = {}
+        # Statistics of the last get_minimax_move call, and an optional profiler (search_stats.py)
+        self.stats = SearchStats()
+        self.profile_hook = None
+        self._deepest = 0
+        # Solved 3x3 table (see solved_table.py); None if it hasn't been built or the board isn't 3x3
+        self.solved_table = None
+        if use_solved_table and self.geometry is get_geometry(3):
+            self.solved_table = SolvedTable.load(solved_table_path)
+        # Persistent position cache shared across runs (position_store.py), or None
+        self.position_store = open_store(position_store)
 
     def reset_board(self):
-        self.board = [" " for _ in range(9)]
+        self.board = [" " for _ in range(self.geometry.cells)]
 
     def print_board(self):
-        print("\n")
-        print(f" {self.board[0]} | {self.board[1]} | {self.board[2]} ")
-        print("---+---+---")
-        print(f" {self.board[3]} | {self.board[4]} | {self.board[5]} ")
-        print("---+---+---")
-        print(f" {self.board[6]} | {self.board[7]} | {self.board[8]} ")
-        print("\n")
+        print_list_board(self.board, self.geometry)
 
     def is_winner(self, player, board_state):
-        # All winning combinations (rows, cols, diagonals)
-        win_conditions = [
-            (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Rows
-            (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Cols
-            (0, 4, 8), (2, 4, 6)              # Diagonals
-        ]
-        for a, b, c in win_conditions:
-            if board_state[a] == board_state[b] == board_state[c] == player:
-                return True
-        return False
+        # Winning segments are precomputed once per geometry (geometry.py)
+        return list_is_winner(player, board_state, self.geometry)
 
     def is_full(self, board_state):
         return " " not in board_state
@@ -45,62 +68,192 @@ class MinimaxTicTacToe:
     # PHASE 2 LOGIC: MINIMAX ALGORITHM (The Improvement)
     # ---------------------------------------------------------
     
-    def minimax(self, board, depth, is_maximizing):
+    def minimax(self, board, depth, is_maximizing, last_move=None):
         """
-        Recursive function to determine the value of a board state.
-        Scores: +10 for AI win, -10 for Human win, 0 for Draw.
+        Recursive function to determine the value of a board state (a BitBoard).
+        Scores: +10 for AI win, -10 for Human win, 0 for Draw (+/-win_score on larger boards).
+        last_move, if given, limits the win check to the segments through that cell.
         Depth is used to prefer winning sooner or losing later.
         """
         self.nodes_evaluated += 1
+        if depth > self._deepest:
+            self._deepest = depth
+        if self._budget is not None:
+            self._budget.check(self.nodes_evaluated)
         
         # 1. Base Cases (Terminal States)
-        if self.is_winner(self.ai, board):
-            return 10 - depth  # Win sooner is better
-        if self.is_winner(self.human, board):
-            return -10 + depth # Lose later is better
-        if self.is_full(board):
+        # Only the player who just moved can have won, through last_move
+        if last_move is None:
+            ai_won = board.is_winner(self.ai)
+            human_won = not ai_won and board.is_winner(self.human)
+        else:
+            ai_won = not is_maximizing and board.is_winner_at(self.ai, last_move)
+            human_won = is_maximizing and board.is_winner_at(self.human, last_move)
+        if ai_won:
+            return self.win_score - depth  # Win sooner is better
+        if human_won:
+            return -self.win_score + depth # Lose later is better
+        if board.is_full():
             return 0           # Draw
 
-        # 2. Recursive Step
+        # 2. Horizon (only when iterative deepening sets a depth limit)
+        # draft = plies still to search below this position
+        empties = board.move_count()
+        draft = empties
+        if self._depth_limit is not None:
+            draft = min(empties, self._depth_limit - depth)
+            if draft <= 0:
+                self._hit_horizon = True
+                return self.evaluate(board)
+
+        # 3. Transposition Lookup (rotations/mirrors share one entry)
+        tt = self.tt
+        if tt is not None:
+            key = (board.canonical_key() << 1) | is_maximizing
+            entry = tt.lookup(key)
+            if entry is not None and entry[2] >= draft:
+                if entry[2] < empties:
+                    self._hit_horizon = True  # Entry came from a depth-limited search
+                return from_node_score(entry[0], depth)
+
+        # 4. Recursive Step
         if is_maximizing:
             best_score = -float('inf')
-            for move in self.get_available_moves(board):
-                board[move] = self.ai
-                score = self.minimax(board, depth + 1, False)
-                board[move] = " " # Undo move (backtrack)
+            for move in board.get_available_moves():
+                board.make_move(move, self.ai)
+                score = self.minimax(board, depth + 1, False, move)
+                board.unmake_move(move, self.ai) # Undo move (backtrack)
                 best_score = max(score, best_score)
-            return best_score
         else:
             best_score = float('inf')
-            for move in self.get_available_moves(board):
-                board[move] = self.human
-                score = self.minimax(board, depth + 1, True)
-                board[move] = " " # Undo move (backtrack)
+            for move in board.get_available_moves():
+                board.make_move(move, self.human)
+                score = self.minimax(board, depth + 1, True, move)
+                board.unmake_move(move, self.human) # Undo move (backtrack)
                 best_score = min(score, best_score)
-            return best_score
 
-    def get_minimax_move(self, verbose=True):
+        if tt is not None:
+            tt.store(key, to_node_score(best_score, depth), draft=draft)
+        return best_score
+
+    def evaluate(self, board):
+        """
+        Score of a non-terminal position at the depth limit. Minimax has no
+        static knowledge, so an unfinished game counts as a draw.
+        """
+        return 0
+
+    def choose_move(self, board, player=None, time_limit_ms=None, node_limit=None):
+        """Engine protocol (engines.py): the move for `player` on `board` and the stats of its search."""
+        self.board = engine_board(board, player, self.geometry, self.ai)
+        move = self.get_minimax_move(verbose=False, time_limit_ms=time_limit_ms, node_limit=node_limit)
+        return MoveResult(move, self.stats, self.best_score)
+
+    def best_moves(self, positions, player=None, time_limit_ms=None, node_limit=None):
+        """
+        Batch API (batch_moves.py): a generator of BatchResult(index, move,
+        score, cached) for each position, symmetric duplicates searched once.
+        """
+        return iter_best_moves(self, positions, player, time_limit_ms, node_limit)
+
+    @instrumented
+    def get_minimax_move(self, verbose=True, time_limit_ms=None, node_limit=None):
         """
         Entry point for the AI to find the best move using Minimax.
+        With time_limit_ms and/or node_limit the search deepens one ply at a
+        time and returns the best move of the last fully completed depth.
+        self.budget_used reports the time and nodes actually spent.
         """
-        best_score = -float('inf')
-        best_move = None
+        budget = SearchBudget(time_limit_ms, node_limit)
         self.nodes_evaluated = 0
+        self._deepest = 0
+        if self.tt is not None:
+            self.tt.reset_stats()
+
+        board = BitBoard.from_list(self.board, self.geometry)
+
+        # Solved Table: constant-time answer, search only runs without it
+        if self.solved_table is not None:
+            entry = self.solved_table.lookup(board, self.ai, self.win_score)
+            if entry is not None and entry[1] is not None:
+                self.budget_used = budget.report(0, completed_depth=None, source="solved_table")
+                self.best_score = entry[0]
+                if verbose:
+                    print(f"AI chooses spot {entry[1]} from the solved table (score {entry[0]})")
+                return entry[1]
+
+        # Persistent cache: exact results of earlier searches (any symmetric copy)
+        if self.position_store is not None:
+            entry = self.position_store.get_move(board, win_score=self.win_score)
+            if entry is not None:
+                self.budget_used = budget.report(0, completed_depth=None, source="position_store")
+                self.best_score = entry[0]
+                if verbose:
+                    print(f"AI chooses spot {entry[1]} from the position cache (score {entry[0]})")
+                return entry[1]
         
-        available_moves = self.get_available_moves(self.board)
+        available_moves = board.get_available_moves()
         
         if verbose:
             print("AI Thinking (Minimax Recursion)...")
 
+        if not budget.limited:
+            best_move, best_score = self._search_root(board, available_moves, verbose)
+            completed_depth = len(available_moves)
+        else:
+            # Iterative deepening: every completed depth gives a usable answer
+            best_move, best_score = available_moves[0], None
+            completed_depth = 0
+            self._budget = budget
+            try:
+                for depth_limit in range(1, len(available_moves) + 1):
+                    # Root moves are ply 1, so children see depth_limit - 1 plies below them
+                    self._depth_limit = depth_limit - 1
+                    self._hit_horizon = False
+                    best_move, best_score = self._search_root(board, available_moves, False)
+                    completed_depth = depth_limit
+                    if verbose:
+                        print(f"  Depth {depth_limit}: spot {best_move} (score {best_score})")
+                    if not self._hit_horizon:
+                        break  # Nothing was cut off: the result is exact
+            except SearchTimeout:
+                pass
+            finally:
+                self._budget = None
+                self._depth_limit = None
+
+        self.budget_used = budget.report(self.nodes_evaluated, completed_depth=completed_depth, source="search")
+        self.best_score = best_score
+        if self.position_store is not None and not budget.limited:
+            self.position_store.put_move(board, best_score, best_move, win_score=self.win_score)
+        if self.tt is not None:
+            self.tt_hits = self.tt.hits
+            self.tt_misses = self.tt.misses
+            self.tt_stores = self.tt.stores
+            self.stats.cache_hits = self.tt.hits
+            self.stats.cache_misses = self.tt.misses
+        self.stats.nodes = self.nodes_evaluated
+        # Root moves are ply 1 (depth 0)
+        self.stats.max_depth = self._deepest + 1 if self.nodes_evaluated else 0
+
+        if verbose:
+            print(f"AI chooses spot {best_move} with optimal score {best_score}")
+
+        return best_move
+
+    def _search_root(self, board, available_moves, verbose):
+        """Scores every root move; returns (best_move, best_score)."""
+        best_score = -float('inf')
+        best_move = None
         for move in available_moves:
             # Make the move tentatively
-            self.board[move] = self.ai
+            board.make_move(move, self.ai)
             
             # Calculate score for this move using Minimax
-            score = self.minimax(self.board, 0, False)
+            score = self.minimax(board, 0, False, move)
             
             # Undo the move
-            self.board[move] = " "
+            board.unmake_move(move, self.ai)
 
             if verbose:
                 print(f"  Spot {move}: Minimax Score {score}")
@@ -108,11 +261,7 @@ class MinimaxTicTacToe:
             if score > best_score:
                 best_score = score
                 best_move = move
-        
-        if verbose:
-            print(f"AI chooses spot {best_move} with optimal score {best_score}")
-
-        return best_move
+        return best_move, best_score
 
     # ---------------------------------------------------------
     # GAME LOOP (Same as Heuristic, just uses Minimax)
@@ -128,12 +277,12 @@ class MinimaxTicTacToe:
             
             # Human Turn
             try:
-                move = int(input("Enter your move (0-8): "))
+                move = int(input(f"Enter your move (0-{self.geometry.cells - 1}): "))
                 if self.board[move] != " ":
                     print("Invalid move! Spot taken.")
                     continue
             except (ValueError, IndexError):
-                print("Invalid input! Please enter a number 0-8.")
+                print(f"Invalid input! Please enter a number 0-{self.geometry.cells - 1}.")
                 continue
 
             self.board[move] = self.human
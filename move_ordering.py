@@ -0,0 +1,84 @@
+"""
+Move ordering for alpha-beta search.
+
+Alpha-beta prunes the most when the best move is searched first, so moves
+are sorted by, in order:
+
+1. Immediate wins for the player to move.
+2. Blocks (cells where the opponent would win next move).
+3. Killer moves: the last two moves that caused a cutoff at this depth.
+4. History: how often (weighted by remaining depth) a move caused a
+   cutoff anywhere in the tree for this player.
+5. The static center > corner > edge priorities of HeuristicTicTacToe
+   (heuristic_tictactoe.positional_scores).
+
+The killer and history tables are filled by record_cutoff() during the
+search and cleared with reset() before each new move.
+"""
+
+from heuristic_tictactoe import positional_scores
+
+WIN = 1 << 62
+BLOCK = 1 << 61
+KILLER = (1 << 60, 1 << 59)  # Newest killer first
+
+
+class MoveOrderer:
+
+    def __init__(self, geometry):
+        self.geometry = geometry
+        cells = geometry.cells
+        # For each cell, the rest of every segment through it: the player
+        # owning all of one of those masks wins by playing the cell
+        self.completion_masks = tuple(
+            tuple(mask & ~(1 << cell) for mask in geometry.cell_masks[cell]) for cell in range(cells)
+        )
+        self.priorities = positional_scores(geometry)
+        self.reset()
+
+    def reset(self):
+        cells = self.geometry.cells
+        # killers[depth] = [newest, older]; depth runs from 0 up to one per cell
+        self.killers = [[None, None] for _ in range(cells + 2)]
+        # history[player][cell], player 0 = X, 1 = O
+        self.history = [[0] * cells, [0] * cells]
+
+    def completes(self, bits, cell):
+        """True if owning `bits` plus `cell` completes a segment."""
+        for mask in self.completion_masks[cell]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def order(self, board, moves, player, depth=None):
+        """
+        Returns `moves` sorted best-first for `player` ("X" or "O") at
+        `depth` (None: no killers, e.g. at the root). Equal moves keep their
+        order in `moves`, so a shuffled list still breaks ties randomly.
+        """
+        own = board.x_bits if player == "X" else board.o_bits
+        opponent = board.o_bits if player == "X" else board.x_bits
+        killers = self.killers[depth] if depth is not None else (None, None)
+        history = self.history[0 if player == "X" else 1]
+        priorities = self.priorities
+
+        def score(move):
+            if self.completes(own, move):
+                return WIN
+            if self.completes(opponent, move):
+                return BLOCK
+            if move == killers[0]:
+                return KILLER[0]
+            if move == killers[1]:
+                return KILLER[1]
+            return history[move] * 8 + priorities[move]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def record_cutoff(self, move, player, depth, draft):
+        """Updates the killer and history tables after `move` caused a cutoff with `draft` plies left."""
+        killers = self.killers[depth]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[0 if player == "X" else 1][move] += draft * draft
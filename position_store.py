@@ -0,0 +1,346 @@
+"""
+Persistent position cache (sqlite) that survives restarts.
+
+Search results are keyed by board shape, kind and canonical position (so
+symmetric copies share an entry, and moves are stored in the canonical
+orientation and mapped back on read). Positions are from the engines'
+point of view: X (the AI) is the side to move, or, for MCTS statistics,
+the side that just moved. Kinds:
+
+    "solved"        exact game value and best move, from a search that
+                    reached the end of every line (Minimax scale: a win
+                    on the next move is cells + 1, one less for each ply
+                    after it; see put_move's win_score)
+    "depth4:eval"   an alpha-beta result searched 4 plies deep (":eval":
+                    with the static evaluator), only reused by the same
+                    kind of search
+    "mcts"          visits and wins accumulated over every MCTS search
+                    that reached the position as a root child
+
+Writes are buffered and written back in bulk, one transaction per
+flush_every writes (and on flush() / close() / exit). With max_entries the
+least recently used entries are evicted on each write-back. Any number of
+processes can share one file: the database runs in WAL mode, so readers
+never block, and PositionStore(path, readonly=True) opens it read-only
+(e.g. a cache warmed before a deploy, shared by every server worker).
+
+Pool workers exit through os._exit, which skips atexit, so their buffered
+writes would be lost. A store inherited through a fork or unpickled in
+another process (it pickles as just its settings) therefore writes every
+entry through; a worker that opens its own store calls flush() at the end
+of each task (see game_server.search_move).
+
+Engines take it as position_store=PositionStore(...) (or a path):
+
+    store = PositionStore("positions.sqlite")
+    engine = MCTSTicTacToe(size=4, position_store=store)
+
+Warm a cache with every opening up to N plies:
+
+    python3 position_store.py positions.sqlite --engine mcts --rows 4 --plies 2 --iterations 20000
+"""
+
+import argparse
+import atexit
+import os
+import sys
+import time
+
+from bitboard import BitBoard
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    shape TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    score REAL,
+    best_move INTEGER,
+    visits INTEGER NOT NULL DEFAULT 0,
+    wins REAL NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (shape, kind, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS positions_last_used ON positions (last_used);
+"""
+
+UPSERT = """
+INSERT INTO positions (shape, kind, key, score, best_move, visits, wins, last_used)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (shape, kind, key) DO UPDATE SET
+    score = COALESCE(excluded.score, score),
+    best_move = COALESCE(excluded.best_move, best_move),
+    visits = visits + excluded.visits,
+    wins = wins + excluded.wins,
+    last_used = excluded.last_used
+"""
+
+SOLVED = "solved"
+MCTS = "mcts"
+
+
+def depth_kind(depth, static_eval):
+    return f"depth{depth}:eval" if static_eval else f"depth{depth}"
+
+
+def shape_of(geometry):
+    return f"{geometry.rows}x{geometry.cols}x{geometry.k}"
+
+
+def open_store(store):
+    """A PositionStore for the engines' position_store option: a store, a path, or None."""
+    if isinstance(store, (str, os.PathLike)):
+        return PositionStore(store)
+    return store
+
+
+class PositionStore:
+
+    def __init__(self, path, readonly=False, max_entries=None, flush_every=1000):
+        self.path = path
+        self.readonly = readonly
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}  # (shape, kind, key) -> [score, best_move, visits, wins]
+        self._touched = set()  # Entries read since the last write-back (for LRU eviction)
+        self._conn = None
+        self._pid = None
+        self._write_through = False  # Set in copies living in another process (see the module docstring)
+        if not readonly:
+            atexit.register(self.flush)
+
+    def __getstate__(self):
+        return {"path": self.path, "readonly": self.readonly, "max_entries": self.max_entries,
+                "flush_every": self.flush_every}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+        self._write_through = True
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            import sqlite3  # Only stores that are used pay for the import
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked: the parent's connection and buffered writes belong to the parent
+                self._pending = {}
+                self._touched = set()
+                self._write_through = True
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5.0)
+            else:
+                conn = sqlite3.connect(self.path, timeout=5.0)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                # The schema script commits (a disk sync), so it only runs on a new file
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'positions'").fetchone() is None:
+                    conn.executescript(SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    # ---------------------------------------------------------
+    # ENTRIES
+    # ---------------------------------------------------------
+
+    def _read(self, shape, kind, keys):
+        """{key: [score, best_move, visits, wins]} for the given keys, pending writes included."""
+        rows = {}
+        keys = list(keys)
+        conn = self._connection()
+        for start in range(0, len(keys), 500):  # Stay under sqlite's bound-parameter limit
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, score, best_move, visits, wins in conn.execute(
+                    f"SELECT key, score, best_move, visits, wins FROM positions "
+                    f"WHERE shape = ? AND kind = ? AND key IN ({marks})", [shape, kind] + chunk):
+                rows[key] = [score, best_move, visits, wins]
+        for key in keys:
+            pending = self._pending.get((shape, kind, key))
+            if pending is None:
+                continue
+            row = rows.setdefault(key, [None, None, 0, 0])
+            if pending[0] is not None:
+                row[0], row[1] = pending[0], pending[1]
+            row[2] += pending[2]
+            row[3] += pending[3]
+        if not self.readonly:
+            self._touched.update((shape, kind, key) for key in rows)
+        return rows
+
+    def _write(self, shape, kind, key, score=None, best_move=None, visits=0, wins=0):
+        if self.readonly:
+            return
+        entry = self._pending.get((shape, kind, key))
+        if entry is None:
+            self._pending[(shape, kind, key)] = [score, best_move, visits, wins]
+        else:
+            if score is not None:
+                entry[0], entry[1] = score, best_move
+            entry[2] += visits
+            entry[3] += wins
+        if self._write_through or len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def get_move(self, board, kind=SOLVED, win_score=None):
+        """
+        (score, best_move) stored for `board` (X to move) under `kind`, the
+        move in this board's orientation, or None. "solved" scores come back
+        on the scale of `win_score` (default cells + 1).
+        """
+        key, perm = board.canonical_form()
+        row = self._read(shape_of(board.geometry), kind, [format(key, "x")]).get(format(key, "x"))
+        if row is None or row[1] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        score = row[0]
+        if kind == SOLVED:
+            score = _rescale(score, board.cells + 1, win_score)
+        score = int(score) if score == int(score) else score
+        return score, perm.index(int(row[1]))
+
+    def put_move(self, board, score, best_move, kind=SOLVED, win_score=None):
+        """Stores a search result for `board` (X to move); `win_score` is the searching engine's."""
+        key, perm = board.canonical_form()
+        if kind == SOLVED:
+            score = _rescale(score, win_score, board.cells + 1)
+        self._write(shape_of(board.geometry), kind, format(key, "x"), score=score, best_move=perm[best_move])
+
+    def _child_keys(self, board, moves):
+        keys = {}
+        for move in moves:
+            board.make_move(move, "X")
+            keys[move] = format(board.canonical_key(), "x")
+            board.unmake_move(move, "X")
+        return keys
+
+    def get_child_stats(self, board):
+        """
+        {move: (visits, wins)} accumulated for X's moves from `board` (moves
+        never searched are left out). Symmetric moves lead to one shared
+        entry, whose totals are split evenly between them.
+        """
+        keys = self._child_keys(board, board.get_available_moves())
+        shares = {}
+        for key in keys.values():
+            shares[key] = shares.get(key, 0) + 1
+        rows = self._read(shape_of(board.geometry), MCTS, shares)
+        stats = {move: (rows[key][2] / shares[key], rows[key][3] / shares[key])
+                 for move, key in keys.items() if key in rows and rows[key][2]}
+        if stats:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return stats
+
+    def add_child_stats(self, board, child_stats):
+        """Adds one search's {move: (visits, wins)} for X's moves from `board`."""
+        keys = self._child_keys(board, child_stats)
+        shape = shape_of(board.geometry)
+        for move, (visits, wins) in child_stats.items():
+            self._write(shape, MCTS, keys[move], visits=visits, wins=wins)
+
+    # ---------------------------------------------------------
+    # WRITE-BACK
+    # ---------------------------------------------------------
+
+    def flush(self):
+        """Writes buffered entries in one transaction, then evicts past max_entries."""
+        if self.readonly or (not self._pending and not self._touched):
+            return
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.executemany(UPSERT, [
+                (shape, kind, key, score, best_move, visits, wins, now)
+                for (shape, kind, key), (score, best_move, visits, wins) in self._pending.items()
+            ])
+            conn.executemany("UPDATE positions SET last_used = ? WHERE shape = ? AND kind = ? AND key = ?",
+                             [(now,) + entry for entry in self._touched if entry not in self._pending])
+            if self.max_entries is not None:
+                excess = conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute("DELETE FROM positions WHERE (shape, kind, key) IN "
+                                 "(SELECT shape, kind, key FROM positions ORDER BY last_used LIMIT ?)", (excess,))
+        self._pending = {}
+        self._touched = set()
+
+    def __len__(self):
+        self.flush()
+        return self._connection().execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self.flush()
+            self._conn.close()
+        self._conn = None
+        if not self.readonly:
+            atexit.unregister(self.flush)
+
+
+def _rescale(score, from_win, to_win):
+    """Moves a win/loss score between win_score scales, keeping the plies to the end of the game."""
+    if from_win is None or to_win is None or from_win == to_win or score == 0:
+        return score
+    return score - from_win + to_win if score > 0 else score + from_win - to_win
+
+
+# ---------------------------------------------------------
+# WARMING
+# ---------------------------------------------------------
+
+def opening_positions(geometry, plies):
+    """Every position (as a board list) up to `plies` moves from the empty board, one per symmetry class."""
+    seen = set()
+    frontier = [(BitBoard(geometry), "X")]
+    for ply in range(plies + 1):
+        next_frontier = []
+        for board, player in frontier:
+            key = (board.canonical_key(), player)
+            if key in seen or board.winner() is not None or board.is_full():
+                continue
+            seen.add(key)
+            yield board.to_list(), player
+            for move in board.get_available_moves():
+                child = board.copy()
+                child.make_move(move, player)
+                next_frontier.append((child, "O" if player == "X" else "X"))
+        frontier = next_frontier
+
+
+def main(argv=None):
+    from engines import create_engine, engine_names
+    from geometry import get_geometry
+
+    parser = argparse.ArgumentParser(description="Warm a persistent position cache with every opening position.")
+    parser.add_argument("path")
+    parser.add_argument("--engine", choices=[name for name in engine_names() if name != "heuristic"],
+                        default="mcts")
+    parser.add_argument("--rows", "--size", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=None)
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--plies", type=int, default=2, help="Warm positions up to this many moves in")
+    parser.add_argument("--iterations", type=int, default=None, help="MCTS iterations per position")
+    parser.add_argument("--depth-limit", type=int, default=None, help="Alpha-beta depth limit")
+    parser.add_argument("--max-entries", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    geometry = get_geometry(args.rows, args.cols, args.k)
+    store = PositionStore(args.path, max_entries=args.max_entries)
+    options = {"position_store": store}
+    if args.depth_limit is not None:
+        options["depth_limit"] = args.depth_limit
+    engine = create_engine(args.engine, geometry, **options)
+    start = time.perf_counter()
+    count = 0
+    for board_state, player in opening_positions(geometry, args.plies):
+        engine.choose_move(board_state, player, node_limit=args.iterations)
+        count += 1
+    store.close()
+    print(f"Warmed {count} positions for {geometry.label} in {time.perf_counter() - start:.1f}s -> {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
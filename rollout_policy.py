@@ -0,0 +1,157 @@
+"""
+Rollout policies for MCTS: how the simulated games from a leaf are played.
+
+Every policy has one method, play(board, tracker, last_player, played),
+which plays one game to the end on `tracker` (a WinTracker of `board`,
+where `last_player` just moved) and returns the number of plies played.
+The moves are appended to `played` when it is a list (RAVE uses them).
+The result is read from the tracker afterwards. Policies use the global
+`random`, so random.seed() keeps searches reproducible.
+
+    "random"     every empty cell equally likely (the original rollout)
+    "heuristic"  HeuristicTicTacToe's rules: complete a line if possible,
+                 else block the opponent's, else a random cell weighted by
+                 its positional score (center 5, corner 3, edge 1).
+                 Weaker than "random" on k = size boards: rollouts that
+                 always block mostly end in draws (which count for neither
+                 side), and against random-rollout MCTS at 20 ms a move it
+                 scored 24-73-3 on 4x4 and 13-86-1 on 5x5 (67-33-0 on 5x5,
+                 k = 4). Use "decisive" instead
+    "decisive"   the same without the block: win if possible, else weighted
+                 random. The recommended policy: 80-17-3 on 4x4, 81-16-3 on
+                 5x5 and 78-22-0 on 5x5, k = 4 against random rollouts
+
+The heuristic policy keeps, per player, the lines one piece short of a win
+(k - 1 of that player's pieces, none of the opponent's). They are found
+once per rollout from the tracker's line counts and then updated only on
+the lines through each move. The weighted order of the remaining cells is
+drawn once per rollout (a key of random() ** (1 / weight) per cell, sorted),
+so a ply costs a few list lookups, about as much as a random move.
+
+    engine = MCTSTicTacToe(size=5, rollout_policy="decisive")
+"""
+
+import random
+
+from heuristic_tictactoe import positional_scores
+
+
+class RandomRollout:
+
+    name = "random"
+
+    def __init__(self, geometry):
+        self.geometry = geometry
+
+    def play(self, board, tracker, last_player, played=None):
+        # Play the empty cells in a random order until someone wins or no line is left open
+        current_player = last_player
+        remaining = board.get_available_moves()
+        random.shuffle(remaining)
+        plies = 0
+        for move in remaining:
+            current_player = "X" if current_player == "O" else "O"
+            plies += 1
+            if tracker.make_move(move, current_player) or tracker.is_draw():
+                break
+        if played is not None:
+            played.extend(remaining[:plies])
+        return plies
+
+
+class HeuristicRollout:
+
+    name = "heuristic"
+
+    block_probability = 1.0  # Chance of taking a block when there is one
+
+    def __init__(self, geometry, block_probability=None):
+        self.geometry = geometry
+        if block_probability is not None:
+            self.block_probability = block_probability
+        self.threat_count = geometry.k - 1
+        self.segment_masks = geometry.segment_masks
+        self.cell_lines = geometry.cell_segments
+        self.lines = range(len(geometry.segments))
+        self.inverse_weights = tuple(1.0 / score for score in positional_scores(geometry))
+
+    def play(self, board, tracker, last_player, played=None):
+        threat_count = self.threat_count
+        block_probability = self.block_probability
+        segment_masks = self.segment_masks
+        cell_lines = self.cell_lines
+        x_counts, o_counts = tracker.x_counts, tracker.o_counts
+        x_threats = [line for line in self.lines if x_counts[line] == threat_count and not o_counts[line]]
+        o_threats = [line for line in self.lines if o_counts[line] == threat_count and not x_counts[line]]
+        # Weighted random order of the empty cells: a cell is drawn with probability weight / total
+        inverse_weights = self.inverse_weights
+        rand = random.random
+        order = sorted(board.get_available_moves(), key=lambda cell: rand() ** inverse_weights[cell], reverse=True)
+        empty = board.empty_mask()
+        next_cell = 0
+        player = last_player
+        plies = 0
+        while True:
+            if player == "O":
+                player = "X"
+                mine, theirs, my_threats, their_threats = x_counts, o_counts, x_threats, o_threats
+            else:
+                player = "O"
+                mine, theirs, my_threats, their_threats = o_counts, x_counts, o_threats, x_threats
+
+            move = -1
+            # 1. Win: a line of ours one short (dropped once the opponent has played on it)
+            while my_threats:
+                line = my_threats[-1]
+                if not theirs[line]:
+                    move = (segment_masks[line] & empty).bit_length() - 1
+                    break
+                my_threats.pop()
+            # 2. Block: the opponent's line one short
+            if move < 0 and their_threats and (block_probability >= 1.0 or rand() < block_probability):
+                while their_threats:
+                    line = their_threats[-1]
+                    if not mine[line]:
+                        move = (segment_masks[line] & empty).bit_length() - 1
+                        break
+                    their_threats.pop()
+            # 3. Next empty cell of the weighted order
+            if move < 0:
+                move = order[next_cell]
+                while not empty >> move & 1:
+                    next_cell += 1
+                    move = order[next_cell]
+
+            empty ^= 1 << move
+            plies += 1
+            if played is not None:
+                played.append(move)
+            if tracker.make_move(move, player) or tracker.is_draw():
+                return plies
+            for line in cell_lines[move]:
+                if mine[line] == threat_count and not theirs[line]:
+                    my_threats.append(line)
+
+
+class DecisiveRollout(HeuristicRollout):
+
+    name = "decisive"
+    block_probability = 0.0
+
+
+# "heuristic" is kept for comparison; it makes MCTS weaker on k = size boards (see above)
+ROLLOUT_POLICIES = {
+    RandomRollout.name: RandomRollout,
+    HeuristicRollout.name: HeuristicRollout,
+    DecisiveRollout.name: DecisiveRollout,
+}
+
+
+def get_rollout_policy(policy, geometry):
+    """A policy for the engines' rollout_policy option: a name from ROLLOUT_POLICIES or a policy object."""
+    if not isinstance(policy, str):
+        return policy
+    try:
+        return ROLLOUT_POLICIES[policy](geometry)
+    except KeyError:
+        raise ValueError(f"Unknown rollout policy {policy!r}, expected one of {', '.join(ROLLOUT_POLICIES)}") from None
@@ -0,0 +1,65 @@
+"""
+Per-move search budgets (wall time and/or node count) shared by the engines.
+
+A search counts its nodes and calls check(); once the budget is spent the
+check raises SearchTimeout, which the engine catches at its root to fall
+back on the best result it already has (the last fully completed depth
+for minimax / alpha-beta). MCTS just polls expired() between iterations.
+"""
+
+import time
+
+# Checking the clock on every node is wasted work; look every 256 nodes
+CLOCK_CHECK_INTERVAL = 256
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its budget is used up."""
+
+
+class SearchBudget:
+
+    def __init__(self, time_limit_ms=None, node_limit=None):
+        self.time_limit_ms = time_limit_ms
+        self.node_limit = node_limit
+        self.start = time.perf_counter()
+        self.deadline = None if time_limit_ms is None else self.start + time_limit_ms / 1000.0
+        self.stopped_early = False
+
+    @property
+    def limited(self):
+        return self.deadline is not None or self.node_limit is not None
+
+    def expired(self, nodes):
+        """True once `nodes` reaches the node limit or the deadline has passed."""
+        if self.node_limit is not None and nodes >= self.node_limit:
+            self.stopped_early = True
+            return True
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.stopped_early = True
+            return True
+        return False
+
+    def check(self, nodes):
+        """Raises SearchTimeout when the budget is spent (clock read every 256 nodes)."""
+        if self.node_limit is not None and nodes >= self.node_limit:
+            self.stopped_early = True
+            raise SearchTimeout()
+        if self.deadline is not None and nodes % CLOCK_CHECK_INTERVAL == 0 and time.perf_counter() >= self.deadline:
+            self.stopped_early = True
+            raise SearchTimeout()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000.0
+
+    def report(self, nodes, **extra):
+        """Summary of what the search actually used, e.g. for engine.budget_used."""
+        used = {
+            "elapsed_ms": round(self.elapsed_ms(), 3),
+            "time_limit_ms": self.time_limit_ms,
+            "nodes": nodes,
+            "node_limit": self.node_limit,
+            "stopped_early": self.stopped_early,
+        }
+        used.update(extra)
+        return used
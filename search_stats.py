@@ -0,0 +1,154 @@
+"""
+Per-call search statistics and profiling hooks shared by the engines.
+
+Every engine's move function (get_heuristic_move, get_minimax_move,
+get_best_move, get_mcts_move) starts a fresh SearchStats in engine.stats
+and fills it in as it searches; after the call engine.stats describes
+that one move.
+
+A profile hook wraps each of those calls. It's any callable taking a
+label (e.g. "MCTSTicTacToe.get_mcts_move") and returning a context
+manager, so cProfile (CProfileHook below), a sampling profiler such as
+pyinstrument, or a custom timer all fit. Set engine.profile_hook for one
+engine, set_profile_hook() for every engine, or the TICTACTOE_PROFILE
+environment variable to profile a whole run into a cProfile file without
+touching the code:
+
+    TICTACTOE_PROFILE=/tmp/search.prof python3 simulation_runner.py --engine mcts
+    python3 -m pstats /tmp/search.prof
+"""
+
+import atexit
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+MCTS_PHASES = ("selection", "expansion", "rollout", "backprop")
+
+
+class SearchStats:
+
+    def __init__(self):
+        self.nodes = 0  # Positions searched (tree nodes added, for MCTS)
+        self.cutoffs = 0  # Beta cutoffs
+        self.cache_hits = 0  # Transposition table
+        self.cache_misses = 0
+        self.max_depth = 0  # Deepest ply reached below the root
+        self.iterations = 0  # MCTS iterations
+        self.rollouts = 0  # Random games played (batch rollouts count every game)
+        self.rollout_plies = 0  # Moves played in rollouts
+        self.measured_rollouts = 0  # Rollouts whose length is in rollout_plies
+        self.phase_time = dict.fromkeys(MCTS_PHASES, 0.0)  # Seconds per MCTS phase
+        self.wall_time = 0.0  # Seconds for the whole call
+
+    @property
+    def mean_rollout_length(self):
+        return self.rollout_plies / self.measured_rollouts if self.measured_rollouts else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.wall_time if self.wall_time else 0.0
+
+    def merge(self, other):
+        """Adds another search's counts (e.g. a parallel worker's) into this one; wall time is kept."""
+        for name in ("nodes", "cutoffs", "cache_hits", "cache_misses", "iterations",
+                     "rollouts", "rollout_plies", "measured_rollouts"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for phase, seconds in other.phase_time.items():
+            self.phase_time[phase] = self.phase_time.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "max_depth": self.max_depth,
+            "iterations": self.iterations,
+            "rollouts": self.rollouts,
+            "mean_rollout_length": round(self.mean_rollout_length, 3),
+            "phase_time_ms": {phase: round(seconds * 1000.0, 3) for phase, seconds in self.phase_time.items()},
+            "wall_time_ms": round(self.wall_time * 1000.0, 3),
+        }
+
+    def __repr__(self):
+        return f"SearchStats({self.as_dict()})"
+
+
+# ---------------------------------------------------------
+# PROFILING HOOKS
+# ---------------------------------------------------------
+
+class CProfileHook:
+    """Profile hook running every wrapped search under one cProfile.Profile."""
+
+    def __init__(self, path=None):
+        import cProfile  # Imported on use: pstats alone doubles a CLI call's start-up
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.calls = 0
+        self._active = 0
+
+    @contextmanager
+    def __call__(self, label):
+        self.calls += 1
+        self._active += 1
+        if self._active == 1:
+            self.profile.enable()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if self._active == 0:
+                self.profile.disable()
+
+    def dump(self, path=None):
+        """Writes the collected profile (readable with pstats / snakeviz)."""
+        self.profile.dump_stats(path or self.path)
+
+    def print_stats(self, sort="cumulative", limit=25):
+        import pstats
+        pstats.Stats(self.profile).sort_stats(sort).print_stats(limit)
+
+
+_profile_hook = None
+
+
+def set_profile_hook(hook):
+    """Profile hook for every engine without its own engine.profile_hook (None turns it off)."""
+    global _profile_hook
+    _profile_hook = hook
+
+
+def get_profile_hook():
+    return _profile_hook
+
+
+def instrumented(method):
+    """
+    Decorator for an engine's move function: gives the call a fresh
+    engine.stats, times it, and runs it under the profile hook if one is set.
+    """
+    label = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.stats = stats = SearchStats()
+        hook = getattr(self, "profile_hook", None) or _profile_hook
+        start = time.perf_counter()
+        try:
+            if hook is None:
+                return method(self, *args, **kwargs)
+            with hook(label):
+                return method(self, *args, **kwargs)
+        finally:
+            stats.wall_time = time.perf_counter() - start
+
+    return wrapper
+
+
+if os.environ.get("TICTACTOE_PROFILE"):
+    _profile_hook = CProfileHook(os.environ["TICTACTOE_PROFILE"])
+    atexit.register(_profile_hook.dump)
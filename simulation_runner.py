@@ -0,0 +1,185 @@
+"""
+Headless simulation runner: engine (X) vs a random player (O), no prompts
+and no per-game output.
+
+Games are split into fixed-size chunks and spread over a process pool.
+Every chunk is seeded from (seed, chunk index), so results are
+reproducible for a given seed and chunk size no matter how many workers
+run them. Results are printed (or written) as JSON.
+
+Example:
+    python3 simulation_runner.py --engine alphabeta --engine mcts --games 100000 --workers 16
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from bitboard import BitBoard
+from engines import ENGINES as ENGINE_SPECS, create_engine, get_engine_spec
+from geometry import get_geometry
+
+ENGINES = tuple(ENGINE_SPECS)
+
+
+def make_engine(name, geometry, **options):
+    """
+    Builds an engine from the registry (engines.py) and returns
+    (engine, move function, node counter attribute).
+    `options` go to the engine's constructor.
+    """
+    spec = get_engine_spec(name)
+    engine = create_engine(name, geometry, **options)
+    return engine, getattr(engine, spec.move_method), spec.counter
+
+
+def _move_kwargs(name, iterations, time_limit_ms):
+    kwargs = {"verbose": False}
+    if name == "mcts" and iterations is not None:
+        kwargs["iterations"] = iterations
+    if name != "heuristic" and time_limit_ms is not None:
+        kwargs["time_limit_ms"] = time_limit_ms
+    return kwargs
+
+
+def play_chunk(task):
+    """
+    Plays one chunk of games in a worker. `task` is
+    (engine name, (rows, cols, k), first game index, games, seed, iterations, time_limit_ms).
+    Returns the chunk's totals.
+    """
+    name, shape, first_game, games, seed, iterations, time_limit_ms = task
+    geometry = get_geometry(*shape)
+    # Engines use the global `random`; the random player gets its own stream
+    random.seed(seed)
+    opponent = random.Random(seed ^ 0x5EED)
+    engine, get_move, counter = make_engine(name, geometry)
+    kwargs = _move_kwargs(name, iterations, time_limit_ms)
+
+    totals = {"games": 0, "ai_wins": 0, "random_wins": 0, "draws": 0,
+              "ai_moves": 0, "nodes": 0, "move_time_s": 0.0}
+    for game_num in range(first_game, first_game + games):
+        engine.reset_board()
+        board = BitBoard(geometry)
+        # Alternate starting player, AI starts odd games (same as simulate())
+        ai_turn = game_num % 2 == 1
+        while True:
+            if ai_turn:
+                engine.board = board.to_list()
+                setattr(engine, counter, 0)
+                start = time.perf_counter()
+                move = get_move(**kwargs)
+                totals["move_time_s"] += time.perf_counter() - start
+                totals["nodes"] += getattr(engine, counter)
+                totals["ai_moves"] += 1
+                player = engine.ai
+            else:
+                move = opponent.choice(board.get_available_moves())
+                player = engine.human
+            board.make_move(move, player)
+
+            if board.is_winner_at(player, move):
+                totals["ai_wins" if ai_turn else "random_wins"] += 1
+                break
+            if board.is_full():
+                totals["draws"] += 1
+                break
+            ai_turn = not ai_turn
+        totals["games"] += 1
+    return totals
+
+
+def run_simulation(engine, rows=3, cols=None, k=None, games=1000, workers=1, seed=0,
+                   chunk_size=100, iterations=None, time_limit_ms=None):
+    """
+    Plays `games` games of `engine` vs random and returns the aggregate
+    results as a dict (see summarize()).
+    """
+    geometry = get_geometry(rows, cols, k)
+    shape = (geometry.rows, geometry.cols, geometry.k)
+    tasks = []
+    for index, first in enumerate(range(0, games, chunk_size)):
+        count = min(chunk_size, games - first)
+        tasks.append((engine, shape, first + 1, count, seed * 1000003 + index, iterations, time_limit_ms))
+
+    start = time.perf_counter()
+    totals = {}
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.imap_unordered(play_chunk, tasks)
+            for result in results:
+                _add(totals, result)
+    else:
+        for task in tasks:
+            _add(totals, play_chunk(task))
+    wall_time = time.perf_counter() - start
+
+    return summarize(engine, geometry, totals, wall_time, workers=workers, seed=seed,
+                     chunk_size=chunk_size, iterations=iterations, time_limit_ms=time_limit_ms)
+
+
+def _add(totals, result):
+    for key, value in result.items():
+        totals[key] = totals.get(key, 0) + value
+
+
+def summarize(engine, geometry, totals, wall_time, **settings):
+    games = totals.get("games", 0)
+    moves = totals.get("ai_moves", 0)
+    summary = {
+        "engine": engine,
+        "board": {"rows": geometry.rows, "cols": geometry.cols, "k": geometry.k},
+        "games": games,
+        "ai_wins": totals.get("ai_wins", 0),
+        "random_wins": totals.get("random_wins", 0),
+        "draws": totals.get("draws", 0),
+        "win_rate": totals.get("ai_wins", 0) / games if games else 0.0,
+        "loss_rate": totals.get("random_wins", 0) / games if games else 0.0,
+        "ai_moves": moves,
+        "nodes_per_move": totals.get("nodes", 0) / moves if moves else 0.0,
+        "ms_per_move": totals.get("move_time_s", 0.0) * 1000.0 / moves if moves else 0.0,
+        "wall_time_s": round(wall_time, 3),
+    }
+    summary.update(settings)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless engine vs random simulations with JSON output.")
+    parser.add_argument("--engine", action="append", choices=ENGINES + ("all",),
+                        help="Engine to run (repeatable, default: all)")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=None, help="Default: same as rows")
+    parser.add_argument("--k", type=int, default=None, help="In a row to win (default: shorter side)")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=None, help="MCTS iterations per move")
+    parser.add_argument("--time-limit-ms", type=int, default=None, help="Per-move budget for search engines")
+    parser.add_argument("--output", default=None, help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    engines = args.engine or ["all"]
+    if "all" in engines:
+        engines = list(ENGINES)
+
+    results = [
+        run_simulation(name, args.rows, args.cols, args.k, args.games, args.workers, args.seed,
+                       args.chunk_size, args.iterations, args.time_limit_ms)
+        for name in engines
+    ]
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Precomputed solution of the whole 3x3 game.
+
+Build it once with:
+    python3 solved_table.py
+
+Every reachable position (with either player to move) is solved
+retrograde: positions are grouped by number of pieces and scored from the
+full boards back to the empty one, so each child is final before its
+parents are looked at. The result is written as a flat binary file that
+the Minimax and Alpha-Beta engines memory-map and index directly.
+
+File layout:
+    8-byte header: b"TTTS", version, board size, 2 reserved bytes
+    2 * 3**9 entries of 2 bytes, indexed by
+        base-3 position index (" "=0, "X"=1, "O"=2) + 3**9 if O is to move
+    each entry: best move (0-8, TERMINAL or UNREACHABLE), signed score
+
+Scores are the engines' win_score - depth from X's point of view, so a
+table hit and a search agree: 10 for an X win on the next move, one less
+for each ply after it (negative for O wins, 0 for a draw). A finished
+position holds its result, 10, -10 or 0.
+"""
+
+import mmap
+import os
+import sys
+
+from bitboard import BitBoard
+
+MAGIC = b"TTTS"
+VERSION = 2
+SIZE = 3
+CELLS = SIZE * SIZE
+POSITIONS = 3 ** CELLS
+HEADER_SIZE = 8
+ENTRY_SIZE = 2
+WIN_SCORE = CELLS + 1  # The engines' win_score on 3x3
+
+TERMINAL = 0xFF     # Game is over, no move to play
+UNREACHABLE = 0xFE  # Position can't come up in a legal game
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solved_3x3.bin")
+
+# Base-3 index contribution of every 9-bit mask, so a BitBoard is indexed
+# with two table lookups: _BASE3[x_bits] + 2 * _BASE3[o_bits]
+_BASE3 = tuple(sum(3 ** i for i in range(CELLS) if mask >> i & 1) for mask in range(1 << CELLS))
+
+
+def position_index(board, player_to_move):
+    """Entry index of a BitBoard with `player_to_move` ("X" or "O") to play."""
+    index = _BASE3[board.x_bits] + 2 * _BASE3[board.o_bits]
+    if player_to_move == "O":
+        index += POSITIONS
+    return index
+
+
+def _shift(score):
+    # A score seen one ply further up is one step closer to zero
+    if score > 0:
+        return score - 1
+    if score < 0:
+        return score + 1
+    return 0
+
+
+def solve():
+    """
+    Returns a dict {(x_bits, o_bits, player_to_move): (score, best_move)}
+    covering every reachable position, either player moving first.
+    """
+    # 1. Forward pass: collect reachable positions, layered by pieces played
+    layers = [set() for _ in range(CELLS + 1)]
+    layers[0].add((0, 0, "X"))
+    layers[0].add((0, 0, "O"))
+    for pieces in range(CELLS):
+        for x_bits, o_bits, player in layers[pieces]:
+            board = BitBoard(SIZE, x_bits, o_bits)
+            if board.winner() is not None:
+                continue
+            other = "O" if player == "X" else "X"
+            for move in board.get_available_moves():
+                board.make_move(move, player)
+                layers[pieces + 1].add((board.x_bits, board.o_bits, other))
+                board.unmake_move(move, player)
+
+    # 2. Retrograde pass: full boards first, back to the empty board
+    solved = {}
+    for pieces in range(CELLS, -1, -1):
+        for x_bits, o_bits, player in layers[pieces]:
+            board = BitBoard(SIZE, x_bits, o_bits)
+            if board.is_winner("X"):
+                solved[(x_bits, o_bits, player)] = (10, TERMINAL)
+                continue
+            if board.is_winner("O"):
+                solved[(x_bits, o_bits, player)] = (-10, TERMINAL)
+                continue
+            if board.is_full():
+                solved[(x_bits, o_bits, player)] = (0, TERMINAL)
+                continue
+
+            other = "O" if player == "X" else "X"
+            best_score = None
+            best_move = None
+            for move in board.get_available_moves():
+                board.make_move(move, player)
+                score, reply = solved[(board.x_bits, board.o_bits, other)]
+                board.unmake_move(move, player)
+                if reply != TERMINAL:
+                    score = _shift(score)
+                better = best_score is None or (score > best_score if player == "X" else score < best_score)
+                if better:
+                    best_score = score
+                    best_move = move
+            solved[(x_bits, o_bits, player)] = (best_score, best_move)
+    return solved
+
+
+def build_solved_table(path=DEFAULT_PATH):
+    """Solves 3x3 and writes the table to `path`. Returns the number of positions."""
+    solved = solve()
+    data = bytearray(bytes([UNREACHABLE, 0]) * (2 * POSITIONS))
+    for (x_bits, o_bits, player), (score, move) in solved.items():
+        offset = position_index(BitBoard(SIZE, x_bits, o_bits), player) * ENTRY_SIZE
+        data[offset] = move
+        data[offset + 1] = score & 0xFF
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + bytes([VERSION, SIZE, 0, 0]))
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(solved)
+
+
+class SolvedTable:
+    """
+    Read-only view of a solved-table file. Lookups are a single index
+    computation and two byte reads from the memory map.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self.data[:HEADER_SIZE]
+        expected = HEADER_SIZE + 2 * POSITIONS * ENTRY_SIZE
+        if header[:4] != MAGIC or header[4] != VERSION or header[5] != SIZE or len(self.data) != expected:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {VERSION} solved 3x3 table "
+                             f"(rebuild it with: python3 solved_table.py)")
+
+    @classmethod
+    def load(cls, path=None):
+        """Opens the table, or returns None if the file hasn't been built."""
+        path = DEFAULT_PATH if path is None else path
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def lookup(self, board, player_to_move, win_score=WIN_SCORE):
+        """
+        Returns (score, best_move) for a BitBoard, best_move is None when the
+        game is already over. Returns None for unreachable positions. Win and
+        loss scores are moved to the caller's `win_score`.
+        """
+        offset = HEADER_SIZE + position_index(board, player_to_move) * ENTRY_SIZE
+        move = self.data[offset]
+        if move == UNREACHABLE:
+            return None
+        score = self.data[offset + 1]
+        if score > 127:
+            score -= 256
+        if score > 0:
+            score += win_score - WIN_SCORE
+        elif score < 0:
+            score -= win_score - WIN_SCORE
+        return score, (None if move == TERMINAL else move)
+
+    def close(self):
+        self.data.close()
+
+
+if __name__ == "__main__":
+    out_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    count = build_solved_table(out_path)
+    print(f"Solved {count} positions -> {out_path}")
@@ -0,0 +1,86 @@
+"""
+Static evaluation for depth-limited search on larger boards.
+
+A position is scored by its open lines: every winning segment that holds
+pieces of only one player is worth weights[count] to that player, where
+count is how many of the k cells they already own (a segment holding both
+players' pieces is dead and worth nothing). Scores are from X's point of
+view.
+
+The per-segment counts and the total are kept up to date on every
+make/unmake (only the segments through the played cell change), so
+reading the score at the search horizon is free. EvalBitBoard is a BitBoard
+that does this bookkeeping itself, so the engines' search code is
+unchanged.
+"""
+
+from bitboard import BitBoard
+
+
+def line_weights(k):
+    """weights[count] for count = 0..k-1 pieces in an open line: 0, 1, 4, 16, ..."""
+    return [0] + [4 ** (count - 1) for count in range(1, k)]
+
+
+class LineEvaluator:
+
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.cell_lines = geometry.cell_segments
+        k = geometry.k
+        weights = line_weights(k)
+        # value[x][o]: what a segment with x X pieces and o O pieces adds to the score
+        # (a complete line ends the game before it's ever evaluated, so count k adds 0)
+        self.value = [[0] * (k + 1) for _ in range(k + 1)]
+        for count in range(1, k):
+            self.value[count][0] = weights[count]
+            self.value[0][count] = -weights[count]
+        # Every segment one piece short of k, all for the same player
+        self.max_score = len(geometry.segments) * weights[k - 1] if k > 1 else 0
+        self.x_counts = [0] * len(geometry.segments)
+        self.o_counts = [0] * len(geometry.segments)
+        self.score = 0
+
+    def make_move(self, cell, player):
+        mine = self.x_counts if player == "X" else self.o_counts
+        x_counts, o_counts, value = self.x_counts, self.o_counts, self.value
+        score = self.score
+        for line in self.cell_lines[cell]:
+            score -= value[x_counts[line]][o_counts[line]]
+            mine[line] += 1
+            score += value[x_counts[line]][o_counts[line]]
+        self.score = score
+
+    def unmake_move(self, cell, player):
+        mine = self.x_counts if player == "X" else self.o_counts
+        x_counts, o_counts, value = self.x_counts, self.o_counts, self.value
+        score = self.score
+        for line in self.cell_lines[cell]:
+            score -= value[x_counts[line]][o_counts[line]]
+            mine[line] -= 1
+            score += value[x_counts[line]][o_counts[line]]
+        self.score = score
+
+
+class EvalBitBoard(BitBoard):
+    """BitBoard with a LineEvaluator that follows every make/unmake (board.evaluator.score)."""
+
+    def __init__(self, geometry=3, x_bits=0, o_bits=0):
+        super().__init__(geometry, x_bits, o_bits)
+        self.evaluator = LineEvaluator(self.geometry)
+        for cell in range(self.cells):
+            if x_bits >> cell & 1:
+                self.evaluator.make_move(cell, "X")
+            elif o_bits >> cell & 1:
+                self.evaluator.make_move(cell, "O")
+
+    def copy(self):
+        return EvalBitBoard(self.geometry, self.x_bits, self.o_bits)
+
+    def make_move(self, cell, player):
+        BitBoard.make_move(self, cell, player)
+        self.evaluator.make_move(cell, player)
+
+    def unmake_move(self, cell, player):
+        BitBoard.unmake_move(self, cell, player)
+        self.evaluator.unmake_move(cell, player)
@@ -0,0 +1,95 @@
+"""
+Transposition table shared by the minimax and alpha-beta engines.
+
+Positions are keyed on BitBoard.canonical_key(), so all 8 rotations and
+mirror images of a position share one entry. Each entry remembers whether
+its score is exact or only a bound, which keeps it safe to reuse inside
+alpha-beta windows, and its draft: how many plies were searched below the
+position. A draft equal to the number of empty cells means the score
+came from a full-depth search; depth-limited (iterative deepening)
+searches store smaller drafts, and an entry is only used by a search that
+needs no more depth than it has.
+"""
+
+from collections import OrderedDict
+
+# Entry flags
+EXACT = 0
+LOWER_BOUND = 1  # True score is >= stored score (search failed high)
+UPPER_BOUND = 2  # True score is <= stored score (search failed low)
+
+
+def to_node_score(score, depth, win_threshold=1):
+    """
+    Scores are 10 - depth / -10 + depth, so the same position scores
+    differently depending on how deep in the search it was found. Store
+    them relative to the position itself instead.
+
+    win_threshold is the smallest score that means a forced win; engines
+    with a static evaluator pass it so that heuristic scores below it are
+    stored as they are.
+    """
+    if score >= win_threshold:
+        return score + depth
+    if score <= -win_threshold:
+        return score - depth
+    return score
+
+
+def from_node_score(score, depth, win_threshold=1):
+    """Inverse of to_node_score for a position found at `depth`."""
+    if score >= win_threshold:
+        return score - depth
+    if score <= -win_threshold:
+        return score + depth
+    return score
+
+
+class TranspositionTable:
+
+    def __init__(self, max_size=65536):
+        # Least recently used entries are evicted once max_size is reached
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, key):
+        """Returns (score, flag, draft) or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, score, flag=EXACT, draft=0):
+        if self.max_size <= 0:
+            return
+        entries = self.entries
+        old = entries.get(key)
+        if old is not None:
+            entries.move_to_end(key)
+            if old[2] > draft:
+                return  # Keep the deeper result
+        elif len(entries) >= self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = (score, flag, draft)
+        self.stores += 1
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_stats()
@@ -0,0 +1,116 @@
+"""
+Incremental win detection for playouts.
+
+Instead of rescanning every row, column and diagonal after each move, the
+tracker keeps a piece count per line for each player. A move only touches
+the lines through its cell, so win checks cost O(lines through cell)
+instead of O(rows * cols). The lines are the winning segments of the board's
+BoardGeometry, so any rows x cols board with k in a row works.
+
+It also counts "live" lines (lines that don't yet hold pieces of both
+players). Once no line is live the game can only end in a draw, so
+playouts can stop right there.
+"""
+
+from geometry import get_geometry
+
+
+class WinTracker:
+
+    def __init__(self, geometry=3):
+        # geometry is a BoardGeometry, or a side length for a classic square board
+        geometry = get_geometry(geometry)
+        self.geometry = geometry
+        self.cells = geometry.cells
+        self.line_length = geometry.k
+        self.cell_lines = geometry.cell_segments
+        num_lines = len(geometry.segments)
+        self.x_counts = [0] * num_lines
+        self.o_counts = [0] * num_lines
+        self.x_wins = 0  # Completed lines per player
+        self.o_wins = 0
+        self.live_lines = num_lines
+        self.filled = 0
+
+    @classmethod
+    def from_bitboard(cls, board):
+        tracker = cls(board.geometry)
+        for cell in range(board.cells):
+            bit = 1 << cell
+            if board.x_bits & bit:
+                tracker.make_move(cell, "X")
+            elif board.o_bits & bit:
+                tracker.make_move(cell, "O")
+        return tracker
+
+    def copy(self):
+        tracker = WinTracker.__new__(WinTracker)
+        tracker.geometry = self.geometry
+        tracker.cells = self.cells
+        tracker.line_length = self.line_length
+        tracker.cell_lines = self.cell_lines
+        tracker.x_counts = self.x_counts[:]
+        tracker.o_counts = self.o_counts[:]
+        tracker.x_wins = self.x_wins
+        tracker.o_wins = self.o_wins
+        tracker.live_lines = self.live_lines
+        tracker.filled = self.filled
+        return tracker
+
+    def make_move(self, cell, player):
+        """Places a piece. Returns True if it completed a line for `player`."""
+        if player == "X":
+            mine, theirs = self.x_counts, self.o_counts
+        else:
+            mine, theirs = self.o_counts, self.x_counts
+        won = False
+        for line in self.cell_lines[cell]:
+            count = mine[line] + 1
+            mine[line] = count
+            if count == 1 and theirs[line]:
+                self.live_lines -= 1  # Now blocked for both players
+            if count == self.line_length:
+                won = True
+                if player == "X":
+                    self.x_wins += 1
+                else:
+                    self.o_wins += 1
+        self.filled += 1
+        return won
+
+    def unmake_move(self, cell, player):
+        if player == "X":
+            mine, theirs = self.x_counts, self.o_counts
+        else:
+            mine, theirs = self.o_counts, self.x_counts
+        for line in self.cell_lines[cell]:
+            count = mine[line]
+            if count == self.line_length:
+                if player == "X":
+                    self.x_wins -= 1
+                else:
+                    self.o_wins -= 1
+            if count == 1 and theirs[line]:
+                self.live_lines += 1
+            mine[line] = count - 1
+        self.filled -= 1
+
+    def winner(self):
+        """Returns "X", "O" or None."""
+        if self.x_wins:
+            return "X"
+        if self.o_wins:
+            return "O"
+        return None
+
+    def is_draw(self):
+        """
+        True once nobody can win: the board is full, or every line already
+        holds pieces of both players.
+        """
+        if self.x_wins or self.o_wins:
+            return False
+        return self.filled == self.cells or self.live_lines == 0
+
+    def is_over(self):
+        return bool(self.x_wins or self.o_wins) or self.filled == self.cells or self.live_lines == 0